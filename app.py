@@ -1,18 +1,44 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
 import uvicorn
+from db.database import connect_db, close_db, ping_db
+from db.indexes import ENSURE_INDEXES, ensure_indexes
 from routes.product_routes import router as product_router
 from routes.order_routes import router as order_router
 from routes.auth_routes import router as auth_router
+from routes.admin_routes import router as admin_router
+from metrics import METRICS_ENABLED, render_metrics
+from middleware.metrics import MetricsMiddleware
+from middleware.admission import ADMISSION_ENABLED, AdmissionMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await connect_db()
+    if ENSURE_INDEXES:
+        await ensure_indexes()
+    yield
+    await close_db()
+
 
 app = FastAPI(
     title="E-commerce API",
     description="A comprehensive e-commerce API",
     version="1.0.0",
+    lifespan=lifespan,
 )
+# Added last so it runs first: shed requests still show up in /metrics.
+if ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 app.include_router(auth_router, prefix="/api/auth", tags=["Authentication"])
 
 app.include_router(product_router, prefix="/api", tags=["Products"])
 app.include_router(order_router, prefix="/api", tags=["Orders"])
+app.include_router(admin_router, prefix="/api/admin", tags=["Admin"])
 
 
 @app.get("/", tags=["Health"])
@@ -25,5 +51,20 @@ def read_root():
     }
 
 
+@app.get("/health/db", tags=["Health"])
+async def database_health():
+    if not await ping_db():
+        raise HTTPException(status_code=503, detail="Database unavailable")
+    return {"database": "ok"}
+
+
+
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+def metrics():
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
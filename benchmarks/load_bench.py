@@ -0,0 +1,313 @@
+"""Load and latency benchmark for the API.
+
+Boots `app` in-process behind httpx's ASGI transport, seeds a catalog and
+order history, then drives a weighted mix of search, listing, order history,
+checkout and login/refresh requests at a fixed concurrency. Reports
+throughput and p50/p95/p99 per route, can save the results as a JSON
+baseline and compare a later run against it.
+
+Run from the repository root. With no MongoDB at hand an in-memory stand-in
+is used (see benchmarks/memory_mongo.py):
+
+    python -m benchmarks.load_bench --products 2000 --orders 5000 --concurrency 16
+
+Against a local mongod (the benchmark database is dropped and re-seeded):
+
+    python -m benchmarks.load_bench --mongo-uri mongodb://localhost:27017 --save baseline.json
+    python -m benchmarks.load_bench --mongo-uri mongodb://localhost:27017 --baseline baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+ROUTES = ("search", "listing", "history", "checkout", "login", "refresh")
+DEFAULT_MIX = "search=30,listing=30,history=15,checkout=15,auth=10"
+
+ADJECTIVES = ("Classic", "Slim", "Relaxed", "Vintage", "Organic", "Striped", "Denim", "Linen")
+NOUNS = ("Shirt", "Jeans", "Jacket", "Dress", "Sweater", "Hoodie", "Shorts", "Skirt")
+COLOURS = ("Black", "White", "Navy", "Olive", "Red", "Grey", "Blue", "Beige")
+SIZES = ("XS", "S", "M", "L", "XL")
+SEARCH_TERMS = ("shirt", "sli", "denim jac", "vintage", "hood", "navy dr", "linen sk", "bla")
+
+
+def _configure_env(args):
+    # Settings are read at import time, so they have to be in place before
+    # anything from the app is imported.
+    os.environ["MONGO_URI"] = args.mongo_uri or "mongodb://localhost:27017"
+    os.environ["DB_NAME"] = args.db_name
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("ALGORITHM", "HS256")
+    os.environ.setdefault("SESSION_STORE", "memory")
+
+
+def _parse_mix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ("search", "listing", "history", "checkout", "auth"):
+            raise SystemExit(f"Unknown workload '{name}'")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def _product_name(rng: random.Random) -> str:
+    return f"{rng.choice(COLOURS)} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}"
+
+
+async def seed(db, rng: random.Random, products: int, orders: int, users: int, batch_size=1000):
+    from db.search import search_fields
+
+    await db.products.delete_many({})
+    await db.orders.delete_many({})
+    await db.inventory_shards.delete_many({})
+
+    catalog = []
+    for start in range(0, products, batch_size):
+        docs = []
+        for _ in range(start, min(start + batch_size, products)):
+            name = _product_name(rng)
+            docs.append(
+                {
+                    "name": name,
+                    "price": round(rng.uniform(5, 200), 2),
+                    # Deep enough that checkouts never run out during a run.
+                    "sizes": [
+                        {"size": size, "quantity": 1_000_000}
+                        for size in rng.sample(SIZES, rng.randint(2, len(SIZES)))
+                    ],
+                    **search_fields(name),
+                }
+            )
+        result = await db.products.insert_many(docs)
+        for doc, product_id in zip(docs, result.inserted_ids):
+            catalog.append((str(product_id), doc["name"], doc["price"]))
+
+    user_ids = [f"bench-user-{i}" for i in range(users)]
+    for start in range(0, orders, batch_size):
+        docs = []
+        for _ in range(start, min(start + batch_size, orders)):
+            items = []
+            for product_id, name, price in rng.sample(catalog, min(len(catalog), rng.randint(1, 4))):
+                items.append({"productId": product_id, "qty": rng.randint(1, 3), "name": name, "price": price})
+            docs.append(
+                {
+                    "userId": rng.choice(user_ids),
+                    "items": items,
+                    "total": round(sum(i["price"] * i["qty"] for i in items), 2),
+                }
+            )
+        if docs:
+            await db.orders.insert_many(docs)
+
+    return [product_id for product_id, _, _ in catalog], user_ids
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {route: [] for route in ROUTES}
+        self.errors = {route: 0 for route in ROUTES}
+
+    def record(self, route: str, seconds: float, ok: bool):
+        self.latencies[route].append(seconds)
+        if not ok:
+            self.errors[route] += 1
+
+
+def _percentile(values: list, pct: float) -> float:
+    # Nearest-rank percentile over already sorted values.
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, int(round(pct / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def summarize(recorder: Recorder, elapsed: float) -> dict:
+    routes = {}
+    total = 0
+    for route, values in recorder.latencies.items():
+        if not values:
+            continue
+        values = sorted(values)
+        total += len(values)
+        routes[route] = {
+            "requests": len(values),
+            "errors": recorder.errors[route],
+            "rps": round(len(values) / elapsed, 2),
+            "mean_ms": round(sum(values) / len(values) * 1000, 3),
+            "p50_ms": round(_percentile(values, 50) * 1000, 3),
+            "p95_ms": round(_percentile(values, 95) * 1000, 3),
+            "p99_ms": round(_percentile(values, 99) * 1000, 3),
+        }
+    return {"elapsed_s": round(elapsed, 3), "requests": total, "rps": round(total / elapsed, 2), "routes": routes}
+
+
+async def _timed(recorder, route, call):
+    start = time.perf_counter()
+    try:
+        response = await call()
+        ok = response.status_code < 400
+    except Exception:
+        response, ok = None, False
+    recorder.record(route, time.perf_counter() - start, ok)
+    return response
+
+
+async def run_workload(client, recorder, rng, weights, product_ids, user_ids, requests, concurrency):
+    names = list(weights)
+    weight_values = [weights[name] for name in names]
+    remaining = [requests]
+
+    async def one(kind):
+        if kind == "search":
+            term = rng.choice(SEARCH_TERMS)
+            await _timed(recorder, "search", lambda: client.get("/api/products", params={"name": term, "limit": 10}))
+        elif kind == "listing":
+            params = {"limit": 20, "offset": rng.randrange(0, 200, 20)}
+            if rng.random() < 0.3:
+                params["size"] = rng.choice(SIZES)
+            await _timed(recorder, "listing", lambda: client.get("/api/products", params=params))
+        elif kind == "history":
+            user_id = rng.choice(user_ids)
+            await _timed(recorder, "history", lambda: client.get(f"/api/orders/{user_id}", params={"limit": 10}))
+        elif kind == "checkout":
+            items = [
+                {"productId": product_id, "qty": 1}
+                for product_id in rng.sample(product_ids, min(len(product_ids), rng.randint(1, 3)))
+            ]
+            order = {"userId": rng.choice(user_ids), "items": items}
+            await _timed(recorder, "checkout", lambda: client.post("/api/orders", json=order))
+        else:
+            user_id = rng.choice(user_ids)
+            response = await _timed(
+                recorder, "login", lambda: client.post("/api/auth/login", json={"user_id": user_id})
+            )
+            if response is not None and response.status_code < 400:
+                headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+                await _timed(recorder, "refresh", lambda: client.post("/api/auth/refresh", headers=headers))
+
+    async def worker():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            await one(rng.choices(names, weights=weight_values)[0])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for route, stats in results["routes"].items():
+        base = baseline.get("routes", {}).get(route)
+        if not base:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            if base[metric] and stats[metric] > base[metric] * (1 + tolerance):
+                regressions.append(f"{route} {metric}: {base[metric]:.3f} -> {stats[metric]:.3f}")
+        if stats["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{route} rps: {base['rps']:.2f} -> {stats['rps']:.2f}")
+    return regressions
+
+
+def print_report(results: dict):
+    print(f"{'route':10} {'reqs':>7} {'errors':>6} {'rps':>9} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for route, stats in results["routes"].items():
+        print(
+            f"{route:10} {stats['requests']:7} {stats['errors']:6} {stats['rps']:9.1f} "
+            f"{stats['mean_ms']:9.2f} {stats['p50_ms']:9.2f} {stats['p95_ms']:9.2f} {stats['p99_ms']:9.2f}"
+        )
+    print(f"total      {results['requests']:7} {'':6} {results['rps']:9.1f}   (ms latencies, {results['elapsed_s']}s)")
+
+
+async def _run(args) -> dict:
+    import httpx
+
+    if not args.mongo_uri:
+        from benchmarks.memory_mongo import install
+
+        install()
+
+    from app import app
+    from db.database import close_db, connect_db, get_db
+    from db.indexes import ensure_indexes
+
+    if args.mongo_uri:
+        await connect_db()
+        await get_db().client.drop_database(args.db_name)
+        await ensure_indexes()
+
+    rng = random.Random(args.seed)
+    product_ids, user_ids = await seed(get_db(), rng, args.products, args.orders, args.users)
+    weights = _parse_mix(args.mix)
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            if args.warmup:
+                await run_workload(
+                    client, Recorder(), rng, weights, product_ids, user_ids, args.warmup, args.concurrency
+                )
+            recorder = Recorder()
+            elapsed = await run_workload(
+                client, recorder, rng, weights, product_ids, user_ids, args.requests, args.concurrency
+            )
+    finally:
+        await close_db()
+
+    results = summarize(recorder, elapsed)
+    results["config"] = {
+        "backend": "mongodb" if args.mongo_uri else "memory",
+        "products": args.products,
+        "orders": args.orders,
+        "users": args.users,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "mix": args.mix,
+        "seed": args.seed,
+    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongo-uri", help="Local MongoDB to benchmark against; in-memory when omitted")
+    parser.add_argument("--db-name", default="hrone_bench")
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against a previously saved JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before failing")
+    args = parser.parse_args()
+
+    _configure_env(args)
+    results = asyncio.run(_run(args))
+    print_report(results)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
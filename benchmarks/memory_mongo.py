@@ -0,0 +1,89 @@
+"""In-memory MongoDB stand-in for running the load benchmark without a server.
+
+Backed by mongomock-motor, which mimics Motor; the few places where PyMongo's
+AsyncMongoClient differs (awaited aggregate and close, synchronous
+start_session) are bridged here. mongomock has no transactions, lacks the
+string and set operators used for search relevance and only understands plain
+UpdateOne writes in bulk_write, so those pieces are adapted too (search results
+are ranked by exact match only). Latencies measured against it reflect the
+API/serialization overhead, not real database I/O; use a local mongod for
+numbers that include the database.
+"""
+from types import SimpleNamespace
+
+
+class _Transaction:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _Session(_Transaction):
+    # Falsy so the driver-facing code paths treat it like "no session".
+    def __bool__(self):
+        return False
+
+    async def start_transaction(self, *args, **kwargs):
+        return _Transaction()
+
+    async def commit_transaction(self):
+        pass
+
+    async def abort_transaction(self):
+        pass
+
+
+def _bulk_write(self, requests, ordered=True, bypass_document_validation=False, session=None, **kwargs):
+    matched = modified = 0
+    for op in requests:
+        result = self.update_one(
+            op._filter,
+            op._doc,
+            upsert=op._upsert,
+            array_filters=getattr(op, "_array_filters", None),
+        )
+        matched += result.matched_count
+        modified += result.modified_count
+    return SimpleNamespace(matched_count=matched, modified_count=modified, upserted_count=0)
+
+
+def _relevance_stages(text: str) -> list:
+    from db.search import tokenize
+
+    phrase = " ".join(tokenize(text))
+    return [
+        {"$addFields": {"_score": {"$cond": [{"$eq": ["$search_name", phrase]}, 100, 0]}}},
+        {"$sort": {"_score": -1, "_id": 1}},
+    ]
+
+
+async def _awaitable(value):
+    return value
+
+
+def install():
+    from mongomock_motor import AsyncLatentCommandCursor, AsyncMongoMockClient
+    import mongomock.collection
+    import db.database as database
+    import db.product_repository as product_repository
+
+    client = AsyncMongoMockClient()
+
+    def start_session(*args, **kwargs):
+        return _Session()
+
+    async def close():
+        pass
+
+    client.start_session = start_session
+    client.close = close
+    # AsyncMongoClient's aggregate() is a coroutine that resolves to the cursor.
+    AsyncLatentCommandCursor.__await__ = lambda self: _awaitable(self).__await__()
+    database._client = client
+
+    mongomock.collection.Collection.bulk_write = _bulk_write
+
+    product_repository.relevance_stages = _relevance_stages
+    return client
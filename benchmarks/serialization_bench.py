@@ -0,0 +1,99 @@
+"""Compare the default and fast serialization paths for an order history page.
+
+Both paths go through the real GET /api/orders/{user_id} route, so the
+default path pays for response_model validation exactly as it does in
+production. Only the controller is replaced, returning a prepared page instead
+of querying MongoDB, so no database is needed. Run from the repository root:
+
+    python -m benchmarks.serialization_bench --orders 50 --items 20
+"""
+from bson import ObjectId
+from fastapi.testclient import TestClient
+import argparse
+import timeit
+
+from controllers import order_controller, serialization
+import routes.order_routes as order_routes
+
+USER_ID = "bench-user"
+
+
+def _sample_orders(orders: int, items: int):
+    return [
+        {
+            "_id": ObjectId(),
+            "userId": USER_ID,
+            "items": [
+                {
+                    "productId": str(ObjectId()),
+                    "qty": 1 + i % 3,
+                    "name": f"Product {i}",
+                    "price": 9.99 + i,
+                }
+                for i in range(items)
+            ],
+            "total": 0.0,
+        }
+        for _ in range(orders)
+    ]
+
+
+def _page(orders: list):
+    return {"next": "6", "limit": len(orders), "previous": None, "cursor": None}
+
+
+def _use_fast_serialization(enabled: bool):
+    order_controller.FAST_SERIALIZATION = enabled
+    serialization.FAST_SERIALIZATION = enabled
+
+
+def _stub_controller(orders: list):
+    # Builds the page the way get_user_orders does once the documents are
+    # loaded, honouring the current FAST_SERIALIZATION setting.
+    async def get_user_orders(user_id, limit, offset, cursor, include_total):
+        return {
+            "data": [order_controller._order_response(order, {}) for order in orders],
+            "page": _page(orders),
+        }
+
+    order_routes.get_user_orders = get_user_orders
+
+
+def _client():
+    # Imported late so the stubbed controller is the one the route calls.
+    from app import app
+
+    return TestClient(app)
+
+
+def default_path(client: TestClient):
+    # Per-item models, validated against OrderListResponse by FastAPI.
+    _use_fast_serialization(False)
+    return client.get(f"/api/orders/{USER_ID}").content
+
+
+def fast_path(client: TestClient):
+    _use_fast_serialization(True)
+    return client.get(f"/api/orders/{USER_ID}").content
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=50)
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    _stub_controller(_sample_orders(args.orders, args.items))
+    client = _client()
+    results = {}
+    for name, path in (("default", default_path), ("fast", fast_path)):
+        seconds = min(timeit.repeat(lambda: path(client), number=args.repeat, repeat=5))
+        results[name] = seconds / args.repeat * 1000
+        print(f"{name:8} {results[name]:8.3f} ms/page")
+
+    print(f"speedup  {results['default'] / results['fast']:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
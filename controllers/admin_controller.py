@@ -0,0 +1,65 @@
+from fastapi import HTTPException, status
+from db.indexes import audit_query_plans
+from db.product_cache import product_cache_stats
+from db.counts import count_cache_stats
+from db.single_flight import single_flight_stats
+from db.inventory import (
+    INVENTORY_MAX_SHARDS,
+    shard_product_stock,
+    unshard_product_stock,
+)
+from db.product_cache import invalidate_products
+from bson import ObjectId
+
+
+async def get_query_plan_report():
+    try:
+        report = await audit_query_plans()
+
+        return {
+            "queries": report,
+            "collscans": [entry["shape"] for entry in report if entry["collscan"]],
+        }
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to audit query plans: {str(e)}",
+        )
+
+
+def get_cache_stats():
+    return {
+        "products": product_cache_stats(),
+        "counts": count_cache_stats(),
+        "single_flight": single_flight_stats(),
+    }
+
+
+async def shard_inventory(product_id: str, shards: int):
+    if not ObjectId.is_valid(product_id):
+        return {"error": f"Invalid product ID format: {product_id}"}
+
+    # Each shard is a document per size, and every checkout and listing reads
+    # all of them.
+    if shards < 1 or shards > INVENTORY_MAX_SHARDS:
+        return {"error": f"shards must be between 1 and {INVENTORY_MAX_SHARDS}"}
+
+    result = await shard_product_stock(product_id, shards)
+    if result is None:
+        return {"error": "Product not found"}
+
+    await invalidate_products(stock_only=True)
+    return result
+
+
+async def unshard_inventory(product_id: str):
+    if not ObjectId.is_valid(product_id):
+        return {"error": f"Invalid product ID format: {product_id}"}
+
+    result = await unshard_product_stock(product_id)
+    if result is None:
+        return {"error": "Product not found"}
+
+    await invalidate_products(stock_only=True)
+    return result
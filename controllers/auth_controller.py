@@ -21,7 +21,7 @@ class SessionResponse(BaseModel):
     expires_in: int
 
 
-def create_new_session(request: SessionCreateRequest = None):
+async def create_new_session(request: SessionCreateRequest = None):
     try:
         user_data = {}
         if request:
@@ -30,7 +30,7 @@ def create_new_session(request: SessionCreateRequest = None):
             if request.metadata:
                 user_data.update(request.metadata)
 
-        token = create_session(user_data)
+        token = await create_session(user_data)
 
         return {
             "access_token": token,
@@ -46,9 +46,9 @@ def create_new_session(request: SessionCreateRequest = None):
         )
 
 
-def logout_session(token: str):
+async def logout_session(token: str, session: dict = None):
     try:
-        success = invalidate_session(token)
+        success = await invalidate_session(token, session)
         if success:
             return {"message": "Session invalidated successfully"}
         else:
@@ -66,9 +66,9 @@ def logout_session(token: str):
         )
 
 
-def refresh_user_session(token: str):
+async def refresh_user_session(token: str, session: dict = None):
     try:
-        new_token = refresh_session(token)
+        new_token = await refresh_session(token, session)
 
         return {
             "access_token": new_token,
@@ -86,9 +86,9 @@ def refresh_user_session(token: str):
         )
 
 
-def get_session_info(token: str):
+async def get_session_info(token: str, session: dict = None):
     try:
-        session_data = get_session_data(token)
+        session_data = session if session is not None else await get_session_data(token)
 
         return {
             "session_id": session_data["session_id"],
@@ -107,9 +107,9 @@ def get_session_info(token: str):
         )
 
 
-def get_sessions_stats():
+async def get_sessions_stats():
     try:
-        active_count = get_active_sessions_count()
+        active_count = await get_active_sessions_count()
 
         return {
             "active_sessions": active_count,
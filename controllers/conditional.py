@@ -0,0 +1,51 @@
+from datetime import timezone
+from email.utils import format_datetime
+from fastapi import Response
+import os
+
+CATALOG_CACHE_CONTROL = os.getenv("CATALOG_CACHE_CONTROL", "no-cache")
+
+
+def catalog_validators(versions: dict, stock: bool = False) -> dict:
+    # The ETag is derived from the catalog counters alone, so a matching
+    # If-None-Match can be answered before the listing is loaded.
+    if stock:
+        etag = f'"c{versions["catalog"]}s{versions["stock"]}"'
+        updated_at = versions.get("updated_at")
+    else:
+        etag = f'"c{versions["catalog"]}"'
+        updated_at = versions.get("catalog_updated_at")
+
+    headers = {"ETag": etag, "Cache-Control": CATALOG_CACHE_CONTROL}
+    if updated_at:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+        headers["Last-Modified"] = format_datetime(updated_at, usegmt=True)
+    return headers
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def not_modified(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
+
+
+def with_headers(content, response: Response, headers: dict):
+    # Pre-encoded responses carry their own headers; plain content gets them
+    # through the injected response.
+    if headers:
+        target = content if isinstance(content, Response) else response
+        target.headers.update(headers)
+    return content
@@ -1,151 +1,373 @@
-from db.order_repository import create_order, get_orders
-from controllers.product_controller import get_products
-from models.order_model import OrderCreate, OrderResponse, OrderItemResponse
-from models.product_model import OrderProductResponse
-from db.database import get_db
+from db.order_repository import (
+    create_order,
+    create_orders,
+    get_orders,
+    get_orders_after,
+    get_orders_aggregated,
+    iter_orders,
+    update_order,
+    delete_order as remove_order,
+)
+from db.product_repository import find_products
+from db.inventory import (
+    StockConflictError,
+    load_products_with_stock,
+    reserve_stock,
+    retry_on_conflict,
+    stock_deductions,
+    stock_levels,
+)
+from db.product_cache import get_products_by_ids, invalidate_products
+from db.pagination import decode_cursor, page_info
+from db.order_snapshots import snapshot_items, has_snapshot
+from db.read_routing import record_user_writes, user_wrote_recently
+from controllers.export import EXPORT_FORMATS, csv_rows, ndjson_lines
+from controllers.serialization import FAST_SERIALIZATION
+from models.order_model import OrderCreate, OrderResponse
 from bson import ObjectId
 from bson.errors import InvalidId
-from fastapi import HTTPException
+from pydantic import ValidationError
+import os
 
+BULK_ORDER_CHUNK_SIZE = int(os.getenv("BULK_ORDER_CHUNK_SIZE", "500"))
+# "find" issues separate page, count and product queries; "aggregate" does all
+# three in one $facet/$lookup pipeline.
+ORDER_HISTORY_STRATEGY = os.getenv("ORDER_HISTORY_STRATEGY", "find").lower()
 
-def create_new_order(order: OrderCreate):
-    db = get_db()
+
+def order_document(order: OrderCreate, products: dict):
+    order_data = order.dict()
+    order_data["items"], order_data["total"] = snapshot_items(
+        order_data["items"], products
+    )
+    return order_data
+
+
+async def _after_orders_written(user_ids: list, stock_changed: bool = True):
+    # The orders are already stored, so a failure here must not be reported
+    # as a failed order: the client would retry and place it twice.
+    if stock_changed:
+        try:
+            await invalidate_products(stock_only=True)
+        except Exception as e:
+            print(f"Failed to bump the stock version after an order: {e}")
+
+    try:
+        await record_user_writes(user_ids)
+    except Exception as e:
+        print(f"Failed to record the read-your-writes window: {e}")
+
+
+async def create_new_order(order: OrderCreate):
+    product_ids = []
     for item in order.items:
         try:
             product_object_id = ObjectId(item.productId)
         except InvalidId:
             return {"error": f"Invalid product ID format: {item.productId}"}
 
-        product = db.products.find_one({"_id": product_object_id})
-        if not product:
-            return {"error": f"Product with ID {item.productId} not found"}
+        if product_object_id not in product_ids:
+            product_ids.append(product_object_id)
 
-        total_available = 0
-        if "sizes" in product and isinstance(product["sizes"], list):
-            for size_obj in product["sizes"]:
-                total_available += size_obj.get("quantity", 0)
-        else:
-            total_available = product.get("quantity", 0)
+    async def place_order():
+        products = await load_products_with_stock(product_ids)
+        levels = stock_levels(products)
 
-        if total_available < item.qty:
-            return {
-                "error": f"Insufficient stock for {product['name']}. Available: {total_available}, Requested: {item.qty}"
-            }
+        error = reserve_stock(order.items, products, levels)
+        if error:
+            return {"error": error}
+
+        order_id = await create_order(
+            order_document(order, products), stock_deductions(products, levels)
+        )
+        await _after_orders_written([order.userId])
+        return {"id": order_id}
 
     try:
-        with db.client.start_session() as session:
-            with session.start_transaction():
-                order_dict = order.dict()
-                result = db.orders.insert_one(order_dict, session=session)
-
-                for item in order.items:
-                    try:
-                        product_object_id = ObjectId(item.productId)
-                    except InvalidId:
-                        raise HTTPException(
-                            status_code=400,
-                            detail=f"Invalid product ID: {item.productId}",
-                        )
-
-                    remaining_qty = item.qty
-                    product = db.products.find_one(
-                        {"_id": product_object_id}, session=session
-                    )
-
-                    for i, size_obj in enumerate(product["sizes"]):
-                        if remaining_qty <= 0:
-                            break
-
-                        available = size_obj["quantity"]
-                        to_deduct = min(available, remaining_qty)
-
-                        if to_deduct > 0:
-                            db.products.update_one(
-                                {"_id": product_object_id},
-                                {"$inc": {f"sizes.{i}.quantity": -to_deduct}},
-                                session=session,
-                            )
-                            remaining_qty -= to_deduct
-
-                return {"id": str(result.inserted_id)}
+        return await retry_on_conflict(place_order)
 
+    except StockConflictError as e:
+        return {"error": str(e)}
     except Exception as e:
         return {"error": f"Failed to create order: {str(e)}"}
 
 
-def get_user_orders(user_id: str, limit: int = 6, offset: int = 0):
-    orders, total = get_orders(user_id, limit, offset)
+async def _ndjson_lines(chunks):
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+def _parse_order_line(line: bytes):
+    order = OrderCreate.parse_raw(line)
+    for item in order.items:
+        ObjectId(item.productId)
+    return order
+
+
+async def _import_order_chunk(batch: list):
+    product_ids = []
+    for _, order in batch:
+        for item in order.items:
+            product_object_id = ObjectId(item.productId)
+            if product_object_id not in product_ids:
+                product_ids.append(product_object_id)
+
+    async def place_orders():
+        products = await load_products_with_stock(product_ids)
+        levels = stock_levels(products)
+
+        results = []
+        accepted = []
+        for line_no, order in batch:
+            error = reserve_stock(order.items, products, levels)
+            if error:
+                results.append({"line": line_no, "error": error})
+            else:
+                accepted.append((line_no, order))
+
+        if not accepted:
+            return results
+
+        order_ids = await create_orders(
+            [order_document(order, products) for _, order in accepted],
+            stock_deductions(products, levels),
+        )
+        await _after_orders_written([order.userId for _, order in accepted])
+        return results + [
+            {"line": line_no, "id": order_id}
+            for (line_no, _), order_id in zip(accepted, order_ids)
+        ]
+
+    try:
+        return await retry_on_conflict(place_orders)
+    except Exception as e:
+        return [
+            {"line": line_no, "error": f"Failed to create order: {str(e)}"}
+            for line_no, _ in batch
+        ]
+
+
+async def import_orders(chunks):
+    results = []
+    batch = []
+    line_no = 0
+
+    async for line in _ndjson_lines(chunks):
+        line_no += 1
+        if not line.strip():
+            continue
+
+        try:
+            order = _parse_order_line(line)
+        except (ValidationError, InvalidId, ValueError) as e:
+            results.append({"line": line_no, "error": f"Invalid order: {str(e)}"})
+            continue
+
+        batch.append((line_no, order))
+        if len(batch) >= BULK_ORDER_CHUNK_SIZE:
+            results.extend(await _import_order_chunk(batch))
+            batch = []
+
+    if batch:
+        results.extend(await _import_order_chunk(batch))
+
+    results.sort(key=lambda result: result["line"])
+    created = sum(1 for result in results if "id" in result)
 
+    return {
+        "results": results,
+        "summary": {
+            "received": len(results),
+            "created": created,
+            "failed": len(results) - created,
+        },
+    }
+
+
+def _order_product_ids(orders):
+    # Only orders placed before item snapshots existed need a product lookup.
     all_product_ids = []
     for order in orders:
         for item in order["items"]:
+            if has_snapshot(item):
+                continue
             if item["productId"] not in all_product_ids:
                 all_product_ids.append(item["productId"])
+    return all_product_ids
 
-    products_list, _ = get_products(product_ids=all_product_ids)
-    products_dict = {product["id"]: product for product in products_list}
 
-    response_orders = []
+def _priced_items(order, products_dict: dict):
+    priced_items = []
+    total_price = 0
 
-    for order in orders:
-        order_items = []
-        total_price = 0
-
-        for item in order["items"]:
+    for item in order["items"]:
+        if has_snapshot(item):
+            product = {"id": item["productId"], "name": item["name"], "price": item["price"]}
+        else:
             product = products_dict.get(item["productId"])
-            if product:
-                product_details = OrderProductResponse(
-                    id=product["id"], name=product["name"]
-                )
-                item_total = product["price"] * item["qty"]
-                total_price += item_total
-
-                order_items.append(
-                    OrderItemResponse(
-                        productDetails=product_details,
-                        qty=item["qty"],
-                    )
-                )
-
-        response_orders.append(
-            OrderResponse(
-                id=str(order["_id"]),
-                items=order_items,
-                total=total_price,
-            )
+        if product:
+            total_price += product["price"] * item["qty"]
+            priced_items.append((product, item["qty"]))
+
+    return priced_items, order.get("total", total_price)
+
+
+def _order_payload(order, products_dict: dict):
+    priced_items, total_price = _priced_items(order, products_dict)
+
+    return {
+        "id": str(order["_id"]),
+        "items": [
+            {
+                "productDetails": {"id": product["id"], "name": product["name"]},
+                "qty": qty,
+            }
+            for product, qty in priced_items
+        ],
+        "total": total_price,
+    }
+
+
+def _order_response(order, products_dict: dict):
+    payload = _order_payload(order, products_dict)
+    if FAST_SERIALIZATION:
+        return payload
+    return OrderResponse(**payload)
+
+
+async def get_user_orders(
+    user_id: str,
+    limit: int = 6,
+    offset: int = 0,
+    cursor: str = None,
+    include_total: bool = False,
+):
+    # Users who just placed an order read their history from the primary so
+    # it is not missing from a lagging secondary.
+    primary = await user_wrote_recently(user_id)
+
+    if cursor is not None:
+        try:
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            return {"error": str(e)}
+
+        orders, has_more, total = await get_orders_after(
+            user_id, after, limit, include_total, primary
+        )
+        products_dict = await get_products_by_ids(_order_product_ids(orders))
+    elif ORDER_HISTORY_STRATEGY == "aggregate":
+        orders, has_more, total = await get_orders_aggregated(
+            user_id, limit, offset, include_total, primary
+        )
+        products_dict = {
+            str(product["_id"]): {
+                "id": str(product["_id"]),
+                "name": product["name"],
+                "price": product["price"],
+            }
+            for order in orders
+            for product in order["products"]
+        }
+    else:
+        orders, has_more, total = await get_orders(
+            user_id, limit, offset, include_total, primary
         )
+        products_dict = await get_products_by_ids(_order_product_ids(orders))
 
-    next_offset = offset + limit if offset + limit < total else None
-    prev_offset = offset - limit if offset - limit >= 0 else None
+    response_orders = [_order_response(order, products_dict) for order in orders]
 
     return {
         "data": response_orders,
-        "page": {
-            "next": str(next_offset) if next_offset is not None else None,
-            "limit": len(response_orders),
-            "previous": (
-                prev_offset if prev_offset is not None else None
-            ),
-        },
+        "page": page_info(
+            len(response_orders),
+            limit,
+            offset,
+            has_more,
+            orders[-1]["_id"] if orders else None,
+            cursor_mode=cursor is not None,
+            total=total,
+        ),
     }
 
 
-def delete_order(order_id: str):
-    db = get_db()
-    result = db.orders.delete_one({"_id": ObjectId(order_id)})
+async def export_user_orders(user_id: str, format: str = "ndjson", batch_size: int = 500):
+    if format not in EXPORT_FORMATS:
+        return {"error": f"Unsupported export format: {format}"}
+    if batch_size < 1:
+        return {"error": "batch_size must be positive"}
+
+    return _stream_user_orders(user_id, format, batch_size)
 
-    if result.deleted_count == 0:
+
+async def _stream_user_orders(user_id: str, format: str, batch_size: int):
+    if format == "csv":
+        yield csv_rows(
+            [["order_id", "product_id", "product_name", "price", "qty", "order_total"]]
+        )
+
+    batch = []
+    primary = await user_wrote_recently(user_id)
+    async for order in iter_orders(user_id, batch_size, primary):
+        batch.append(order)
+        if len(batch) >= batch_size:
+            yield await _export_order_batch(batch, format)
+            batch = []
+
+    if batch:
+        yield await _export_order_batch(batch, format)
+
+
+async def _export_order_batch(orders: list, format: str):
+    products_dict = await get_products_by_ids(_order_product_ids(orders))
+    records = []
+
+    for order in orders:
+        if format == "csv":
+            priced_items, total_price = _priced_items(order, products_dict)
+            order_id = str(order["_id"])
+            records.extend(
+                [order_id, product["id"], product["name"], product["price"], qty, total_price]
+                for product, qty in priced_items
+            )
+        else:
+            records.append(_order_payload(order, products_dict))
+
+    return csv_rows(records) if format == "csv" else ndjson_lines(records)
+
+
+async def delete_order(order_id: str):
+    deleted_count = await remove_order(order_id)
+
+    if deleted_count == 0:
         return {"error": "Order not found"}
 
     return {"message": "Order deleted successfully"}
 
 
-def edit_order(order_id: str, order: OrderCreate):
-    db = get_db()
-    order_dict = order.dict()
-    result = db.orders.update_one({"_id": ObjectId(order_id)}, {"$set": order_dict})
+async def edit_order(order_id: str, order: OrderCreate):
+    product_ids = []
+    for item in order.items:
+        try:
+            product_ids.append(ObjectId(item.productId))
+        except InvalidId:
+            return {"error": f"Invalid product ID format: {item.productId}"}
+
+    products = await find_products(product_ids)
+    for item in order.items:
+        if item.productId not in products:
+            return {"error": f"Product with ID {item.productId} not found"}
+
+    matched_count = await update_order(order_id, order_document(order, products))
 
-    if result.matched_count == 0:
+    if matched_count == 0:
         return {"error": "Order not found"}
 
+    await _after_orders_written([order.userId], stock_changed=False)
     return {"message": "Order updated successfully"}
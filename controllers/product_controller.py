@@ -1,79 +1,238 @@
-from db.product_repository import create_product
+from db.product_repository import (
+    create_product,
+    get_products,
+    get_products_after,
+    iter_products,
+    suggest_products,
+    update_product,
+    delete_product as remove_product,
+    PRODUCT_FIELDS,
+    DEFAULT_PRODUCT_FIELDS,
+)
+from db.inventory import (
+    overlay_sharded_stock,
+    restripe_if_sharded,
+    delete_product_shards,
+    run_transaction,
+)
+from db.product_cache import cached_listing, listing_key, invalidate_products
+from db.catalog_version import get_catalog_versions
+from db.read_routing import changed_recently
+from db.search import query_terms
+from controllers.conditional import catalog_validators
+from db.pagination import decode_cursor, page_info
+from controllers.export import EXPORT_FORMATS, csv_rows, ndjson_lines
 from models.product_model import ProductCreate, ProductResponse
 
-from db.database import get_db
-from bson import ObjectId
-import re
 
+async def create_new_product(product: ProductCreate):
+    product_id = await create_product(product.dict())
+    await invalidate_products()
 
-def get_products(
+    return {"id": product_id}
+
+
+def _parse_fields(fields: str = None):
+    if not fields:
+        return DEFAULT_PRODUCT_FIELDS
+
+    requested = []
+    for field in fields.split(","):
+        field = field.strip()
+        if field and field != "id" and field not in requested:
+            requested.append(field)
+
+    unknown = [field for field in requested if field not in PRODUCT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return tuple(requested)
+
+
+async def list_products(
     name: str = None,
     size: str = None,
-    product_ids: list = None,
     limit: int = 6,
     offset: int = 0,
+    cursor: str = None,
+    include_total: bool = False,
+    fields: str = None,
 ):
-    db = get_db()
-    query = {}
+    try:
+        selected = _parse_fields(fields)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    if name and not query_terms(name):
+        name = None
+
+    # Keys carry the catalog version so workers stop serving a page as soon
+    # as they see another worker's bump.
+    stock = "sizes" in selected
+    versions = await get_catalog_versions()
+    # Stock levels and pages cached right after a catalog change are read
+    # from the primary; a secondary could still serve the old data, which
+    # would then be cached under the new version.
+    primary = stock or changed_recently(versions["catalog_updated_at"])
+    return await cached_listing(
+        listing_key(
+            name, size, limit, offset, cursor, include_total, ",".join(selected),
+            versions["catalog"], versions["stock"] if stock else None,
+            stock=stock,
+        ),
+        lambda: _load_products_page(
+            name, size, limit, offset, cursor, include_total, selected, primary
+        ),
+    )
 
-    if name:
-        query["name"] = {"$regex": re.escape(name), "$options": "i"}
 
-    if size:
-        query["sizes.size"] = size
+async def listing_validators(fields: str = None):
+    try:
+        selected = _parse_fields(fields)
+    except ValueError:
+        return None
 
-    if product_ids:
-        object_ids = [ObjectId(pid) for pid in product_ids]
-        query["_id"] = {"$in": object_ids}
+    return catalog_validators(await get_catalog_versions(), stock="sizes" in selected)
 
-    products = db.products.find(query).skip(offset).limit(limit)
-    return [
-        {"id": str(product["_id"]), "name": product["name"], "price": product["price"]}
-        for product in products
-    ], db.products.count_documents(query)
+
+async def suggestion_validators():
+    return catalog_validators(await get_catalog_versions())
+
+
+async def _load_products_page(
+    name: str = None,
+    size: str = None,
+    limit: int = 6,
+    offset: int = 0,
+    cursor: str = None,
+    include_total: bool = False,
+    fields=DEFAULT_PRODUCT_FIELDS,
+    primary: bool = False,
+):
+    if cursor is not None:
+        try:
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            return {"error": str(e)}
+
+        products_list, has_more, total = await get_products_after(
+            name, size, after, limit, include_total, fields, primary
+        )
+    else:
+        products_list, has_more, total = await get_products(
+            name, size, None, limit, offset, include_total, fields, primary
+        )
+
+    if "sizes" in fields:
+        await overlay_sharded_stock(products_list)
+
+    # Offset pages of a name search are ranked by relevance, not _id, so a
+    # cursor built from the last _id would skip matches.
+    keyset = cursor is not None or not name
+
+    return {
+        "data": products_list,
+        "page": page_info(
+            len(products_list),
+            limit,
+            offset,
+            has_more,
+            products_list[-1]["id"] if products_list and keyset else None,
+            cursor_mode=cursor is not None,
+            total=total,
+        ),
+    }
 
 
-def create_new_product(product: ProductCreate):
-    # product_id = create_product(product)
-    db = get_db()
-    product = product.dict()
-    result = db.products.insert_one(product)
+async def suggest_product_names(prefix: str, limit: int = 10):
+    if not prefix or not query_terms(prefix):
+        return {"data": []}
 
-    return {"id": str(result.inserted_id)}
+    versions = await get_catalog_versions()
+    primary = changed_recently(versions["catalog_updated_at"])
+    return await cached_listing(
+        listing_key("suggest", prefix.strip().lower(), limit, versions["catalog"]),
+        lambda: _load_suggestions(prefix, limit, primary),
+    )
 
 
-def list_products(name: str = None, size: str = None, limit: int = 6, offset: int = 0):
-    products_list, total = get_products(name, size, None, limit, offset)
+async def _load_suggestions(prefix: str, limit: int, primary: bool = False):
+    return {"data": await suggest_products(prefix, limit, primary)}
 
-    next_offset = offset + limit if offset + limit < total else None
-    prev_offset = offset - limit if offset - limit >= 0 else None
 
-    return {
-        "data": products_list,
-        "page": {
-            "next": str(next_offset) if next_offset is not None else None,
-            "limit": len(products_list),
-            "previous": (
-                prev_offset if prev_offset is not None else None
+async def export_products(
+    name: str = None, size: str = None, format: str = "ndjson", batch_size: int = 500
+):
+    if format not in EXPORT_FORMATS:
+        return {"error": f"Unsupported export format: {format}"}
+    if batch_size < 1:
+        return {"error": "batch_size must be positive"}
+
+    return _stream_products(name, size, format, batch_size)
+
+
+async def _stream_products(name: str, size: str, format: str, batch_size: int):
+    if format == "csv":
+        yield csv_rows([["id", "name", "price", "sizes"]])
+
+    batch = []
+    async for product in iter_products(name, size, batch_size):
+        batch.append(
+            {
+                "id": str(product["_id"]),
+                "name": product["name"],
+                "price": product["price"],
+                "sizes": product.get("sizes", []),
+            }
+        )
+
+        if len(batch) >= batch_size:
+            yield await _export_product_batch(batch, format)
+            batch = []
+
+    if batch:
+        yield await _export_product_batch(batch, format)
+
+
+async def _export_product_batch(products: list, format: str):
+    await overlay_sharded_stock(products)
+    if format != "csv":
+        return ndjson_lines(products)
+
+    return csv_rows(
+        [
+            product["id"],
+            product["name"],
+            product["price"],
+            ";".join(
+                f"{size_obj['size']}:{size_obj['quantity']}" for size_obj in product["sizes"]
             ),
-        },
-    }
+        ]
+        for product in products
+    )
 
 
-def delete_product(product_id: str):
-    db = get_db()
-    result = db.products.delete_one({"_id": ObjectId(product_id)})
-    return {"deleted": result.deleted_count > 0}
+async def delete_product(product_id: str):
+    deleted_count = await remove_product(product_id)
+    await delete_product_shards(product_id)
+    await invalidate_products()
+    return {"deleted": deleted_count > 0}
 
 
-def edit_product(product_id: str, product: ProductCreate):
-    db = get_db()
+async def edit_product(product_id: str, product: ProductCreate):
     product_data = product.dict()
-    result = db.products.update_one(
-        {"_id": ObjectId(product_id)}, {"$set": product_data}
-    )
 
-    if result.matched_count == 0:
+    # The new quantities and their re-split into shards commit together; the
+    # version is bumped afterwards so no listing caches the halfway state.
+    async def update(session):
+        matched_count = await update_product(product_id, product_data, session)
+        if matched_count:
+            await restripe_if_sharded(product_id, session)
+        return matched_count
+
+    matched_count = await run_transaction(update)
+    await invalidate_products()
+
+    if matched_count == 0:
         return {"error": "Product not found"}
 
     return {
@@ -0,0 +1,27 @@
+from fastapi import Response
+import json
+import os
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is listed in requirements.txt
+    orjson = None
+
+# Opt-in: controllers build plain dicts instead of per-item Pydantic models
+# and routes return them pre-encoded, skipping response_model validation.
+FAST_SERIALIZATION = os.getenv("FAST_SERIALIZATION", "false").lower() == "true"
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content)
+        return json.dumps(content, separators=(",", ":")).encode()
+
+
+def json_response(content):
+    if FAST_SERIALIZATION:
+        return FastJSONResponse(content)
+    return content
@@ -0,0 +1,91 @@
+from metrics import Counter, Histogram, register
+import asyncio
+import os
+
+PRODUCT_BATCH_ENABLED = os.getenv("PRODUCT_BATCH_ENABLED", "true").lower() == "true"
+PRODUCT_BATCH_MAX_SIZE = int(os.getenv("PRODUCT_BATCH_MAX_SIZE", "100"))
+PRODUCT_BATCH_WAIT_MS = float(os.getenv("PRODUCT_BATCH_WAIT_MS", "2"))
+
+batch_loader_keys_total = register(
+    Counter(
+        "batch_loader_keys_total",
+        "Keys requested from batch loaders, and how many were already queued.",
+        ("loader", "kind"),
+    )
+)
+batch_loader_batch_size = register(
+    Histogram(
+        "batch_loader_batch_size",
+        "Distinct keys resolved per batch query.",
+        ("loader",),
+        buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+    )
+)
+
+
+class BatchLoader:
+    # DataLoader-style batching: keys requested by concurrent callers within
+    # `wait_ms` (or until `max_batch_size` distinct keys are queued) are
+    # resolved with a single call to `load_fn(keys) -> {key: value}`. Keys
+    # missing from the result resolve to None.
+
+    def __init__(self, name: str, load_fn, max_batch_size: int, wait_ms: float):
+        self.name = name
+        self.load_fn = load_fn
+        self.max_batch_size = max_batch_size
+        self.wait_ms = wait_ms
+        self.queue = {}
+        self.flush_handle = None
+        # The event loop only keeps weak references to tasks, so running
+        # batches are held here until they finish.
+        self.tasks = set()
+
+    def _future(self, key):
+        future = self.queue.get(key)
+        if future is not None:
+            batch_loader_keys_total.inc(self.name, "deduplicated")
+            return future
+
+        batch_loader_keys_total.inc(self.name, "queued")
+        loop = asyncio.get_running_loop()
+        future = self.queue[key] = loop.create_future()
+        if len(self.queue) >= self.max_batch_size:
+            self._dispatch()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.wait_ms / 1000, self._dispatch)
+        return future
+
+    def _dispatch(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+
+        batch, self.queue = self.queue, {}
+        if batch:
+            batch_loader_batch_size.observe(len(batch), self.name)
+            task = asyncio.ensure_future(self._resolve(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _resolve(self, batch: dict):
+        try:
+            results = await self.load_fn(list(batch))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(results.get(key))
+
+    async def load_many(self, keys: list) -> dict:
+        if not PRODUCT_BATCH_ENABLED:
+            return await self.load_fn(keys)
+
+        # Futures are shared between callers; shielding keeps one caller's
+        # cancellation from cancelling them for the rest.
+        futures = [asyncio.shield(self._future(key)) for key in keys]
+        values = await asyncio.gather(*futures)
+        return {key: value for key, value in zip(keys, values) if value is not None}
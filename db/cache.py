@@ -0,0 +1,80 @@
+from collections import OrderedDict
+import time
+
+
+class CacheBackend:
+    # Interface for cache storage. A shared backend (e.g. Redis) can implement
+    # these methods and be installed with set_product_cache().
+
+    async def get_many(self, keys: list) -> dict:
+        raise NotImplementedError
+
+    async def set_many(self, items: dict):
+        raise NotImplementedError
+
+    async def delete_many(self, keys: list):
+        raise NotImplementedError
+
+    async def delete_prefix(self, prefix: str):
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        raise NotImplementedError
+
+
+class InMemoryCache(CacheBackend):
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get_many(self, keys: list) -> dict:
+        now = time.monotonic()
+        found = {}
+        for key in keys:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self.entries[key]
+                    self.evictions += 1
+                self.misses += 1
+                continue
+
+            self.entries.move_to_end(key)
+            found[key] = entry[1]
+            self.hits += 1
+        return found
+
+    async def set_many(self, items: dict):
+        expires_at = time.monotonic() + self.ttl_seconds
+        for key, value in items.items():
+            self.entries[key] = (expires_at, value)
+            self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    async def delete_many(self, keys: list):
+        for key in keys:
+            self.entries.pop(key, None)
+
+    async def delete_prefix(self, prefix: str):
+        for key in [key for key in self.entries if key.startswith(prefix)]:
+            del self.entries[key]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,64 @@
+from datetime import datetime
+from pymongo import ReturnDocument
+from db.database import get_db
+import os
+import time
+
+CATALOG_VERSION_POLL_SECONDS = float(os.getenv("CATALOG_VERSION_POLL_SECONDS", "1"))
+
+COUNTER_ID = "catalog"
+
+# `catalog` changes when products are created, edited or deleted; `stock`
+# additionally changes on every stock movement. Listings without stock levels
+# only depend on the first.
+_versions = {"catalog": 0, "stock": 0, "updated_at": None, "catalog_updated_at": None}
+_checked_at = None
+
+
+def _remember(doc: dict):
+    global _checked_at
+    # Stock moves with every bump, so an older document read by a slow poll
+    # never overwrites a newer one.
+    if doc and doc.get("stock", 0) >= _versions["stock"]:
+        _versions.update(
+            catalog=doc.get("catalog", 0),
+            stock=doc.get("stock", 0),
+            updated_at=doc.get("updated_at"),
+            catalog_updated_at=doc.get("catalog_updated_at"),
+        )
+    _checked_at = time.monotonic()
+
+
+async def get_catalog_versions() -> dict:
+    # Other workers' bumps are picked up by polling the counter document at
+    # most once per CATALOG_VERSION_POLL_SECONDS; in between this is answered
+    # from memory.
+    global _checked_at
+    now = time.monotonic()
+    if _checked_at is None or now - _checked_at >= CATALOG_VERSION_POLL_SECONDS:
+        # Claim the refresh up front so concurrent requests keep using the
+        # current values instead of all polling at once.
+        _checked_at = now
+        db = get_db()
+        _remember(await db.counters.find_one({"_id": COUNTER_ID}))
+
+    return dict(_versions)
+
+
+async def bump_catalog_version(stock_only: bool = False) -> dict:
+    db = get_db()
+    now = datetime.utcnow()
+    increments = {"stock": 1}
+    timestamps = {"updated_at": now}
+    if not stock_only:
+        increments["catalog"] = 1
+        timestamps["catalog_updated_at"] = now
+
+    doc = await db.counters.find_one_and_update(
+        {"_id": COUNTER_ID},
+        {"$inc": increments, "$set": timestamps},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    _remember(doc)
+    return dict(_versions)
@@ -0,0 +1,38 @@
+from db.cache import InMemoryCache
+import json
+import os
+
+COUNT_CACHE_MAX_ENTRIES = int(os.getenv("COUNT_CACHE_MAX_ENTRIES", "10000"))
+COUNT_CACHE_TTL_SECONDS = float(os.getenv("COUNT_CACHE_TTL_SECONDS", "10"))
+
+# Totals are only needed for display, so a few seconds of staleness is an
+# acceptable price for not re-counting on every page request.
+_counts = InMemoryCache(COUNT_CACHE_MAX_ENTRIES, COUNT_CACHE_TTL_SECONDS)
+
+
+def _count_key(collection, query: dict, version=None) -> str:
+    return f"{collection.name}:{version}:" + json.dumps(query, sort_keys=True, default=str)
+
+
+async def count_documents(
+    collection, query: dict, version=None, fresh: bool = False
+) -> int:
+    # `version` retires cached totals when the counted data changes (the
+    # catalog version for products); `fresh` skips the lookup but still
+    # refreshes the entry, for callers that must see their own writes.
+    if not query:
+        return await collection.estimated_document_count()
+
+    key = _count_key(collection, query, version)
+    if not fresh:
+        found = await _counts.get_many([key])
+        if key in found:
+            return found[key]
+
+    total = await collection.count_documents(query)
+    await _counts.set_many({key: total})
+    return total
+
+
+def count_cache_stats() -> dict:
+    return _counts.stats()
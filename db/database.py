@@ -1,6 +1,15 @@
-from pymongo import MongoClient
+from pymongo import AsyncMongoClient
 from pymongo.errors import ConnectionFailure
+from pymongo.read_preferences import (
+    Nearest,
+    Primary,
+    PrimaryPreferred,
+    Secondary,
+    SecondaryPreferred,
+)
 from dotenv import load_dotenv
+from db.monitoring import event_listeners
+from metrics import METRICS_ENABLED
 import os
 
 load_dotenv()
@@ -8,20 +17,119 @@ load_dotenv()
 MONGO_URI = os.getenv("MONGO_URI")
 DB_NAME = os.getenv("DB_NAME", "ecommerce_db")  # Default fallback
 
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(
+    os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")
+)
+# Read preference for browsing reads (listings, search, order history);
+# stock checks and transactions always use the primary.
+MONGO_BROWSE_READ_PREFERENCE = os.getenv("MONGO_BROWSE_READ_PREFERENCE", "secondaryPreferred")
+MONGO_MAX_STALENESS_SECONDS = int(os.getenv("MONGO_MAX_STALENESS_SECONDS", "90"))
 
-def get_db():
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+_client = None
+_browse_db = None
+
+
+def _create_client():
     if not MONGO_URI:
         raise ValueError("MONGO_URI environment variable is not set")
 
     if not DB_NAME:
         raise ValueError("DB_NAME environment variable is not set")
 
-    client = MongoClient(MONGO_URI)
+    return AsyncMongoClient(
+        MONGO_URI,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+        waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        event_listeners=event_listeners() if METRICS_ENABLED else [],
+    )
+
+
+def get_client():
+    global _client
+
+    # The client is normally opened by the app lifespan; scripts that import
+    # repositories directly get it lazily on first use.
+    if _client is None:
+        _client = _create_client()
+
+    return _client
+
+
+async def connect_db():
+    client = get_client()
     try:
-        client.admin.command("ping")
+        await client.admin.command("ping")
         print(f"Connected to MongoDB - Database: {DB_NAME}")
     except ConnectionFailure as e:
         print(f"MongoDB connection failed: {e}")
+        await close_db()
         raise
 
-    return client[DB_NAME]
+    return client
+
+
+async def close_db():
+    global _client, _browse_db
+
+    _browse_db = None
+    if _client is not None:
+        client, _client = _client, None
+        await client.close()
+        print("MongoDB connection closed")
+
+
+async def ping_db() -> bool:
+    try:
+        await get_client().admin.command("ping")
+        return True
+    except ConnectionFailure:
+        return False
+
+
+def get_db():
+    return get_client()[DB_NAME]
+
+
+def _browse_read_preference():
+    mode = READ_PREFERENCES.get(MONGO_BROWSE_READ_PREFERENCE)
+    if mode is None:
+        raise ValueError(
+            f"Unknown MONGO_BROWSE_READ_PREFERENCE: {MONGO_BROWSE_READ_PREFERENCE}"
+        )
+    if mode is Primary:
+        return Primary()
+    return mode(max_staleness=MONGO_MAX_STALENESS_SECONDS)
+
+
+def get_read_db(primary: bool = False):
+    global _browse_db
+
+    if primary:
+        return get_db()
+
+    client = get_client()
+    if _browse_db is None or _browse_db[0] is not client:
+        _browse_db = (
+            client,
+            client.get_database(DB_NAME, read_preference=_browse_read_preference()),
+        )
+    return _browse_db[1]
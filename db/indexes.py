@@ -0,0 +1,130 @@
+from pymongo import ASCENDING, IndexModel
+from bson import ObjectId
+from datetime import datetime
+from db.database import get_db
+from db.product_repository import build_query
+import asyncio
+import os
+import sys
+
+ENSURE_INDEXES = os.getenv("ENSURE_INDEXES", "true").lower() == "true"
+
+INDEXES = {
+    "products": [
+        IndexModel([("sizes.size", ASCENDING), ("_id", ASCENDING)], name="sizes_size_id"),
+        IndexModel([("search_terms", ASCENDING), ("_id", ASCENDING)], name="search_terms_id"),
+    ],
+    "orders": [
+        IndexModel([("userId", ASCENDING), ("_id", ASCENDING)], name="userId_id"),
+    ],
+    "inventory_shards": [
+        IndexModel(
+            [("productId", ASCENDING), ("size", ASCENDING), ("shard", ASCENDING)],
+            name="productId_size_shard",
+            unique=True,
+        ),
+    ],
+    "user_writes": [
+        IndexModel([("until", ASCENDING)], name="until_ttl", expireAfterSeconds=0),
+    ],
+    "sessions": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+}
+
+# Indexes no query uses any more. They still cost a write on every insert and
+# update, so they are dropped where they exist.
+RETIRED_INDEXES = {
+    "products": ["name_ci", "name_text"],
+}
+
+# Representative shapes of the queries issued by the repositories. Values are
+# placeholders; only the shape matters to the query planner.
+QUERY_SHAPES = [
+    ("products.list", "products", build_query(), [("_id", ASCENDING)]),
+    ("products.by_size", "products", build_query(size="M"), [("_id", ASCENDING)]),
+    ("products.by_name", "products", build_query(name="shirt"), [("_id", ASCENDING)]),
+    (
+        "products.by_ids",
+        "products",
+        build_query(product_ids=[str(ObjectId())]),
+        [("_id", ASCENDING)],
+    ),
+    ("orders.by_user", "orders", {"userId": "user"}, [("_id", ASCENDING)]),
+    (
+        "orders.by_user_after",
+        "orders",
+        {"userId": "user", "_id": {"$gt": ObjectId()}},
+        [("_id", ASCENDING)],
+    ),
+    ("sessions.active", "sessions", {"expires_at": {"$gt": datetime.utcnow()}}, []),
+]
+
+
+async def ensure_indexes(db=None):
+    db = db if db is not None else get_db()
+    created = {}
+
+    for collection, models in INDEXES.items():
+        created[collection] = await db[collection].create_indexes(models)
+
+    for collection, names in RETIRED_INDEXES.items():
+        existing = await db[collection].index_information()
+        for name in names:
+            if name in existing:
+                await db[collection].drop_index(name)
+
+    return created
+
+
+def _plan_stages(plan):
+    stages = []
+    while plan:
+        stages.append((plan.get("stage"), plan.get("indexName")))
+        for child in plan.get("inputStages", []):
+            stages.extend(_plan_stages(child))
+        plan = plan.get("inputStage")
+    return stages
+
+
+async def audit_query_plans(db=None):
+    db = db if db is not None else get_db()
+    report = []
+
+    for shape, collection, query, sort in QUERY_SHAPES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.explain()
+        planner = explain.get("queryPlanner", {})
+        winning_plan = planner.get("winningPlan", {})
+        # Slot-based execution engine nests the classic plan under queryPlan.
+        stages = _plan_stages(winning_plan.get("queryPlan", winning_plan))
+
+        report.append(
+            {
+                "shape": shape,
+                "collection": collection,
+                "stages": [stage for stage, _ in stages],
+                "indexes": [index for _, index in stages if index],
+                "collscan": any(stage == "COLLSCAN" for stage, _ in stages),
+            }
+        )
+
+    return report
+
+
+async def _main():
+    await ensure_indexes()
+    report = await audit_query_plans()
+
+    for entry in report:
+        flag = "COLLSCAN" if entry["collscan"] else "ok"
+        indexes = ", ".join(entry["indexes"]) or "-"
+        print(f"{flag:8} {entry['shape']:24} indexes: {indexes}")
+
+    return 1 if any(entry["collscan"] for entry in report) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main()))
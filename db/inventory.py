@@ -0,0 +1,381 @@
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+from bson import ObjectId
+from db.database import get_client, get_db
+from db.product_repository import find_products
+from db.batch_loader import BatchLoader, PRODUCT_BATCH_MAX_SIZE, PRODUCT_BATCH_WAIT_MS
+import asyncio
+import os
+import random
+
+INVENTORY_MAX_RETRIES = int(os.getenv("INVENTORY_MAX_RETRIES", "5"))
+INVENTORY_RETRY_BASE_MS = float(os.getenv("INVENTORY_RETRY_BASE_MS", "10"))
+INVENTORY_RETRY_MAX_MS = float(os.getenv("INVENTORY_RETRY_MAX_MS", "250"))
+INVENTORY_DEFAULT_SHARDS = int(os.getenv("INVENTORY_DEFAULT_SHARDS", "8"))
+INVENTORY_MAX_SHARDS = int(os.getenv("INVENTORY_MAX_SHARDS", "64"))
+
+
+class StockConflictError(Exception):
+    pass
+
+
+def _backoff_seconds(attempt: int) -> float:
+    # Full jitter keeps competing checkouts from retrying in lockstep.
+    ceiling = min(INVENTORY_RETRY_MAX_MS, INVENTORY_RETRY_BASE_MS * 2**attempt)
+    return random.uniform(0, ceiling) / 1000
+
+
+async def run_transaction(callback):
+    # Retries the whole transaction on TransientTransactionError and only the
+    # commit on UnknownTransactionCommitResult, so a commit that may already
+    # have succeeded is never replayed.
+    client = get_client()
+
+    for attempt in range(INVENTORY_MAX_RETRIES):
+        async with client.start_session() as session:
+            await session.start_transaction()
+            try:
+                result = await callback(session)
+            except PyMongoError as e:
+                await session.abort_transaction()
+                if e.has_error_label("TransientTransactionError") and (
+                    attempt < INVENTORY_MAX_RETRIES - 1
+                ):
+                    await asyncio.sleep(_backoff_seconds(attempt))
+                    continue
+                raise
+            except BaseException:
+                await session.abort_transaction()
+                raise
+
+            for commit_attempt in range(INVENTORY_MAX_RETRIES):
+                try:
+                    await session.commit_transaction()
+                    return result
+                except PyMongoError as e:
+                    if e.has_error_label("UnknownTransactionCommitResult") and (
+                        commit_attempt < INVENTORY_MAX_RETRIES - 1
+                    ):
+                        await asyncio.sleep(_backoff_seconds(commit_attempt))
+                        continue
+                    if e.has_error_label("TransientTransactionError") and (
+                        attempt < INVENTORY_MAX_RETRIES - 1
+                    ):
+                        break
+                    raise
+
+        await asyncio.sleep(_backoff_seconds(attempt))
+
+    raise StockConflictError("Order could not be committed, please retry")
+
+
+async def retry_on_conflict(attempt_fn):
+    for attempt in range(INVENTORY_MAX_RETRIES):
+        try:
+            return await attempt_fn()
+        except StockConflictError:
+            if attempt == INVENTORY_MAX_RETRIES - 1:
+                raise
+            await asyncio.sleep(_backoff_seconds(attempt))
+
+
+async def _shard_quantities(product_ids: list, session=None):
+    db = get_db()
+    cursor = db.inventory_shards.find(
+        {"productId": {"$in": product_ids}},
+        {"productId": 1, "size": 1, "shard": 1, "quantity": 1},
+        session=session,
+    )
+
+    shards = {}
+    async for shard in cursor:
+        sizes = shards.setdefault(str(shard["productId"]), {})
+        sizes.setdefault(shard["size"], []).append((shard["shard"], shard["quantity"]))
+    return shards
+
+
+async def _find_products_by_object_id(product_ids: list) -> dict:
+    products = await find_products(product_ids)
+    return {product["_id"]: product for product in products.values()}
+
+
+# Checkouts arriving together read their products with one $in query. The
+# guarded decrements still reject any plan built on a stale read.
+stock_loader = BatchLoader(
+    "stock", _find_products_by_object_id, PRODUCT_BATCH_MAX_SIZE, PRODUCT_BATCH_WAIT_MS
+)
+
+
+async def load_products_with_stock(product_ids: list):
+    # Products in sharded mode keep their stock in inventory_shards; their
+    # per-size quantities are replaced by the sum of the shards.
+    loaded = await stock_loader.load_many(product_ids)
+    # Batched documents are shared between checkouts, so each gets a copy.
+    products = {str(product_id): dict(product) for product_id, product in loaded.items()}
+    sharded = [product["_id"] for product in products.values() if product.get("stock_sharded")]
+    if not sharded:
+        return products
+
+    shards = await _shard_quantities(sharded)
+    for product_id, sizes in shards.items():
+        product = products[product_id]
+        product["_shards"] = sizes
+        product["sizes"] = [
+            {**size_obj, "quantity": sum(q for _, q in sizes.get(size_obj.get("size"), []))}
+            for size_obj in product.get("sizes", [])
+        ]
+    return products
+
+
+async def overlay_sharded_stock(products: list):
+    # Replaces per-size quantities in listing/export rows with shard totals.
+    ids = [ObjectId(product["id"]) for product in products if product.get("sizes")]
+    if not ids:
+        return products
+
+    shards = await _shard_quantities(ids)
+    for product in products:
+        sizes = shards.get(product["id"])
+        if sizes:
+            product["sizes"] = [
+                {**size_obj, "quantity": sum(q for _, q in sizes.get(size_obj["size"], []))}
+                for size_obj in product["sizes"]
+            ]
+    return products
+
+
+def stock_levels(products: dict):
+    # Mutable per-product quantities in document order, used to plan
+    # deductions in memory before anything is written.
+    levels = {}
+    for product_id, product in products.items():
+        if "sizes" in product and isinstance(product["sizes"], list):
+            levels[product_id] = [
+                size_obj.get("quantity", 0) for size_obj in product["sizes"]
+            ]
+        else:
+            levels[product_id] = [product.get("quantity", 0)]
+    return levels
+
+
+def reserve_stock(items, products: dict, levels: dict):
+    requested = {}
+    for item in items:
+        requested[item.productId] = requested.get(item.productId, 0) + item.qty
+
+    for product_id, qty in requested.items():
+        product = products.get(product_id)
+        if not product:
+            return f"Product with ID {product_id} not found"
+
+        total_available = sum(levels[product_id])
+        if total_available < qty:
+            return f"Insufficient stock for {product['name']}. Available: {total_available}, Requested: {qty}"
+
+    for product_id, qty in requested.items():
+        remaining_qty = qty
+        quantities = levels[product_id]
+
+        for i, available in enumerate(quantities):
+            if remaining_qty <= 0:
+                break
+
+            to_deduct = min(available, remaining_qty)
+            quantities[i] -= to_deduct
+            remaining_qty -= to_deduct
+
+    return None
+
+
+def _allocate_shards(shards: list, qty: int):
+    # Start at a random shard so concurrent checkouts of the same SKU land on
+    # different documents.
+    allocations = []
+    start = random.randrange(len(shards))
+    for shard, available in shards[start:] + shards[:start]:
+        if qty <= 0:
+            break
+        take = min(available, qty)
+        if take > 0:
+            allocations.append((shard, take))
+            qty -= take
+    return allocations
+
+
+def stock_deductions(products: dict, levels: dict):
+    deductions = []
+    for product_id, product in products.items():
+        decrements = {}
+        match = {}
+        shard_decrements = []
+        sized = "sizes" in product and isinstance(product["sizes"], list)
+
+        for i, quantity in enumerate(levels[product_id]):
+            if sized:
+                original = product["sizes"][i].get("quantity", 0)
+                path = f"sizes.{i}.quantity"
+            else:
+                original = product.get("quantity", 0)
+                path = "quantity"
+
+            if original <= quantity:
+                continue
+
+            if "_shards" in product:
+                size = product["sizes"][i].get("size")
+                for shard, take in _allocate_shards(
+                    product["_shards"].get(size, []), original - quantity
+                ):
+                    shard_decrements.append((size, shard, take))
+                continue
+
+            decrements[path] = original - quantity
+            if sized:
+                match[f"sizes.{i}.size"] = product["sizes"][i].get("size")
+
+        if decrements or shard_decrements:
+            deductions.append(
+                {
+                    "productId": product["_id"],
+                    "match": match,
+                    "decrements": decrements,
+                    "shards": shard_decrements,
+                }
+            )
+
+    return deductions
+
+
+async def apply_stock_deductions(deductions: list, session=None):
+    db = get_db()
+    product_ops = []
+    shard_ops = []
+
+    for deduction in deductions:
+        # Each decrement is guarded so a concurrent checkout can never push
+        # stock below zero; a failed guard simply matches nothing.
+        if deduction["decrements"]:
+            query = {"_id": deduction["productId"], **deduction["match"]}
+            for path, qty in deduction["decrements"].items():
+                query[path] = {"$gte": qty}
+            update = {path: -qty for path, qty in deduction["decrements"].items()}
+            product_ops.append(UpdateOne(query, {"$inc": update}))
+
+        for size, shard, qty in deduction.get("shards", []):
+            shard_ops.append(
+                UpdateOne(
+                    {
+                        "productId": deduction["productId"],
+                        "size": size,
+                        "shard": shard,
+                        "quantity": {"$gte": qty},
+                    },
+                    {"$inc": {"quantity": -qty}},
+                )
+            )
+
+    for collection, operations in ((db.products, product_ops), (db.inventory_shards, shard_ops)):
+        if not operations:
+            continue
+        result = await collection.bulk_write(operations, session=session)
+        if result.matched_count != len(operations):
+            raise StockConflictError("Stock changed while the order was being placed")
+
+
+async def _split_stock(product_id: str, shards: int, keep_existing: bool, session):
+    db = get_db()
+    object_id = ObjectId(product_id)
+    product = await db.products.find_one({"_id": object_id}, {"sizes": 1}, session=session)
+    if product is None:
+        return None
+
+    totals = {}
+    if keep_existing:
+        existing = await _shard_quantities([object_id], session=session)
+        totals = existing.get(product_id, {})
+    sizes = product.get("sizes", [])
+
+    counters = []
+    for size_obj in sizes:
+        size = size_obj.get("size")
+        total = size_obj.get("quantity", 0) + sum(q for _, q in totals.get(size, []))
+        for shard in range(shards):
+            quantity = total // shards + (1 if shard < total % shards else 0)
+            counters.append(
+                {"productId": object_id, "size": size, "shard": shard, "quantity": quantity}
+            )
+
+    await db.inventory_shards.delete_many({"productId": object_id}, session=session)
+    if counters:
+        await db.inventory_shards.insert_many(counters, session=session)
+    await db.products.update_one(
+        {"_id": object_id},
+        {
+            "$set": {
+                "stock_sharded": True,
+                **{f"sizes.{i}.quantity": 0 for i in range(len(sizes))},
+            }
+        },
+        session=session,
+    )
+    return {"id": product_id, "shards": shards, "sizes": len(sizes)}
+
+
+async def shard_product_stock(
+    product_id: str, shards: int = INVENTORY_DEFAULT_SHARDS, keep_existing: bool = True
+):
+    # Moves a hot product's per-size stock into `shards` counters each so
+    # concurrent decrements spread across documents. Calling it again
+    # re-splits the current totals; with keep_existing=False the quantities
+    # on the product document replace the old shard totals.
+    return await run_transaction(
+        lambda session: _split_stock(product_id, shards, keep_existing, session)
+    )
+
+
+async def unshard_product_stock(product_id: str):
+    db = get_db()
+    object_id = ObjectId(product_id)
+
+    async def merge(session):
+        product = await db.products.find_one({"_id": object_id}, {"sizes": 1}, session=session)
+        if product is None:
+            return None
+
+        totals = (await _shard_quantities([object_id], session=session)).get(product_id, {})
+        await db.products.update_one(
+            {"_id": object_id},
+            {
+                "$set": {
+                    f"sizes.{i}.quantity": size_obj.get("quantity", 0)
+                    + sum(q for _, q in totals.get(size_obj.get("size"), []))
+                    for i, size_obj in enumerate(product.get("sizes", []))
+                },
+                "$unset": {"stock_sharded": ""},
+            },
+            session=session,
+        )
+        await db.inventory_shards.delete_many({"productId": object_id}, session=session)
+        return {"id": product_id, "shards": 0}
+
+    return await run_transaction(merge)
+
+
+async def restripe_if_sharded(product_id: str, session):
+    # Runs in the edit's transaction, so a checkout that decrements a shard
+    # in between conflicts and retries instead of being overwritten.
+    db = get_db()
+    object_id = ObjectId(product_id)
+    shards = await db.inventory_shards.distinct(
+        "shard", {"productId": object_id}, session=session
+    )
+    if not shards:
+        return None
+
+    # Edits write fresh quantities to the product document; they replace the
+    # old shard totals rather than adding to them.
+    return await _split_stock(product_id, len(shards), False, session)
+
+
+async def delete_product_shards(product_id: str):
+    await get_db().inventory_shards.delete_many({"productId": ObjectId(product_id)})
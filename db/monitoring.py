@@ -0,0 +1,124 @@
+from pymongo import monitoring
+from metrics import Counter, Gauge, Histogram, register
+import threading
+
+mongodb_commands_total = register(
+    Counter(
+        "mongodb_commands_total",
+        "MongoDB commands sent, by server so read routing is visible.",
+        ("command", "collection", "server", "status"),
+    )
+)
+mongodb_command_duration_seconds = register(
+    Histogram(
+        "mongodb_command_duration_seconds",
+        "MongoDB command round-trip time.",
+        ("command", "collection"),
+    )
+)
+mongodb_pool_checkout_wait_seconds = register(
+    Histogram(
+        "mongodb_pool_checkout_wait_seconds",
+        "Time spent waiting for a pooled connection.",
+        ("address",),
+    )
+)
+mongodb_pool_checkout_failures_total = register(
+    Counter(
+        "mongodb_pool_checkout_failures_total",
+        "Connection checkouts that failed.",
+        ("address", "reason"),
+    )
+)
+mongodb_pool_connections_in_use = register(
+    Gauge(
+        "mongodb_pool_connections_in_use",
+        "Connections currently checked out of the pool.",
+        ("address",),
+    )
+)
+
+# Commands whose first value is not a collection name.
+_CURSOR_COMMANDS = {"getMore": "collection", "killCursors": None}
+
+
+def _collection(event) -> str:
+    command = event.command
+    if event.command_name in _CURSOR_COMMANDS:
+        field = _CURSOR_COMMANDS[event.command_name]
+        return str(command.get(field, "")) if field else ""
+    value = command.get(event.command_name)
+    return value if isinstance(value, str) else ""
+
+
+def _address(event) -> str:
+    host, port = event.address
+    return f"{host}:{port}"
+
+
+class CommandTimingListener(monitoring.CommandListener):
+    # Finished events carry no command document, so the collection is
+    # remembered from the started event until its reply arrives.
+
+    def __init__(self):
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def _finish(self, event, status: str):
+        with self.lock:
+            collection = self.pending.pop((event.connection_id, event.request_id), "")
+        seconds = event.duration_micros / 1_000_000
+        mongodb_command_duration_seconds.observe(seconds, event.command_name, collection)
+        host, port = event.connection_id
+        mongodb_commands_total.inc(event.command_name, collection, f"{host}:{port}", status)
+
+    def started(self, event):
+        with self.lock:
+            self.pending[(event.connection_id, event.request_id)] = _collection(event)
+
+    def succeeded(self, event):
+        self._finish(event, "ok")
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    def connection_checked_out(self, event):
+        mongodb_pool_checkout_wait_seconds.observe(event.duration, _address(event))
+        mongodb_pool_connections_in_use.inc(_address(event))
+
+    def connection_check_out_failed(self, event):
+        mongodb_pool_checkout_wait_seconds.observe(event.duration, _address(event))
+        mongodb_pool_checkout_failures_total.inc(_address(event), str(event.reason))
+
+    def connection_checked_in(self, event):
+        mongodb_pool_connections_in_use.dec(_address(event))
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+
+def event_listeners() -> list:
+    return [CommandTimingListener(), PoolMetricsListener()]
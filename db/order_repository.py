@@ -1,17 +1,175 @@
-from db.database import get_db
+from db.database import get_db, get_read_db
+from db.inventory import apply_stock_deductions, run_transaction
+from db.pagination import after_id
+from db.counts import count_documents
 from bson import ObjectId
 
+# Order history only renders items and the total.
+ORDER_HISTORY_PROJECTION = {"items": 1, "total": 1}
 
-def create_order(order_data):
+
+async def create_order(order_data: dict, deductions: list):
     db = get_db()
-    order = order_data.dict()
-    result = db.orders.insert_one(order)
-    return str(result.inserted_id)
+
+    async def insert(session):
+        result = await db.orders.insert_one(dict(order_data), session=session)
+        await apply_stock_deductions(deductions, session=session)
+        return str(result.inserted_id)
+
+    return await run_transaction(insert)
 
 
-def get_orders(user_id: str, limit: int = 10, offset: int = 0):
+async def create_orders(orders_data: list, deductions: list):
     db = get_db()
+
+    async def insert(session):
+        result = await db.orders.insert_many(
+            [dict(order_data) for order_data in orders_data], session=session
+        )
+        await apply_stock_deductions(deductions, session=session)
+        return [str(inserted_id) for inserted_id in result.inserted_ids]
+
+    return await run_transaction(insert)
+
+
+async def get_orders(
+    user_id: str,
+    limit: int = 10,
+    offset: int = 0,
+    include_total: bool = False,
+    primary: bool = False,
+):
+    db = get_read_db(primary)
     query = {"userId": user_id}
 
-    orders = db.orders.find(query).skip(offset).limit(limit)
-    return list(orders), db.orders.count_documents(query)
+    cursor = (
+        db.orders.find(query, ORDER_HISTORY_PROJECTION)
+        .sort("_id", 1)
+        .skip(offset)
+        .limit(limit + 1)
+    )
+    orders = await cursor.to_list(length=None)
+
+    total = (
+        await count_documents(db.orders, query, fresh=primary) if include_total else None
+    )
+    return orders[:limit], len(orders) > limit, total
+
+
+async def get_orders_aggregated(
+    user_id: str,
+    limit: int = 10,
+    offset: int = 0,
+    include_total: bool = False,
+    primary: bool = False,
+):
+    # Page, total count and product details for items without a snapshot in
+    # a single round trip.
+    db = get_read_db(primary)
+    pipeline = [
+        {"$match": {"userId": user_id}},
+        {"$sort": {"_id": 1}},
+        {
+            "$facet": {
+                "data": [
+                    {"$skip": offset},
+                    {"$limit": limit + 1},
+                    {"$project": ORDER_HISTORY_PROJECTION},
+                    {
+                        "$addFields": {
+                            "_productIds": {
+                                "$map": {
+                                    "input": {
+                                        "$filter": {
+                                            "input": "$items",
+                                            "cond": {
+                                                "$eq": [{"$type": "$$this.price"}, "missing"]
+                                            },
+                                        }
+                                    },
+                                    "in": {
+                                        "$convert": {
+                                            "input": "$$this.productId",
+                                            "to": "objectId",
+                                            "onError": None,
+                                        }
+                                    },
+                                }
+                            }
+                        }
+                    },
+                    {
+                        "$lookup": {
+                            "from": "products",
+                            "localField": "_productIds",
+                            "foreignField": "_id",
+                            "as": "products",
+                        }
+                    },
+                    {
+                        "$project": {
+                            "items": 1,
+                            "total": 1,
+                            "products._id": 1,
+                            "products.name": 1,
+                            "products.price": 1,
+                        }
+                    },
+                ],
+            }
+        },
+    ]
+    if include_total:
+        pipeline[-1]["$facet"]["total"] = [{"$count": "count"}]
+
+    result = await (await db.orders.aggregate(pipeline)).to_list(length=1)
+    facet = result[0] if result else {"data": []}
+    total = None
+    if include_total:
+        total = facet["total"][0]["count"] if facet.get("total") else 0
+    return facet["data"][:limit], len(facet["data"]) > limit, total
+
+
+async def get_orders_after(
+    user_id: str,
+    after: ObjectId = None,
+    limit: int = 10,
+    include_total: bool = False,
+    primary: bool = False,
+):
+    db = get_read_db(primary)
+    query = {"userId": user_id}
+    total = (
+        await count_documents(db.orders, query, fresh=primary) if include_total else None
+    )
+    if after is not None:
+        query = after_id(query, after)
+
+    cursor = db.orders.find(query, ORDER_HISTORY_PROJECTION).sort("_id", 1).limit(limit + 1)
+    orders = await cursor.to_list(length=None)
+    return orders[:limit], len(orders) > limit, total
+
+
+async def iter_orders(user_id: str, batch_size: int = 500, primary: bool = False):
+    db = get_read_db(primary)
+    cursor = (
+        db.orders.find({"userId": user_id}, ORDER_HISTORY_PROJECTION)
+        .sort("_id", 1)
+        .batch_size(batch_size)
+    )
+    async for order in cursor:
+        yield order
+
+
+async def update_order(order_id: str, order_data: dict):
+    db = get_db()
+    result = await db.orders.update_one(
+        {"_id": ObjectId(order_id)}, {"$set": order_data}
+    )
+    return result.matched_count
+
+
+async def delete_order(order_id: str):
+    db = get_db()
+    result = await db.orders.delete_one({"_id": ObjectId(order_id)})
+    return result.deleted_count
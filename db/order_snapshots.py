@@ -0,0 +1,74 @@
+from pymongo import UpdateOne
+from bson import ObjectId
+from bson.errors import InvalidId
+from db.database import get_db
+import asyncio
+
+
+def snapshot_items(items: list, products: dict):
+    # Copies the name and unit price each item was sold at onto the order so
+    # order history never has to read the products collection.
+    snapshot = []
+    total = 0
+
+    for item in items:
+        product = products.get(item["productId"])
+        if product is None:
+            snapshot.append(dict(item))
+            continue
+
+        snapshot.append(
+            {**item, "name": product["name"], "price": product["price"]}
+        )
+        total += product["price"] * item["qty"]
+
+    return snapshot, total
+
+
+def has_snapshot(item: dict) -> bool:
+    return "name" in item and "price" in item
+
+
+async def backfill_order_snapshots(batch_size: int = 500):
+    # Orders placed before snapshots existed are priced at the current
+    # catalog price, which is what order history showed for them until now.
+    db = get_db()
+    updated = 0
+    batch = []
+
+    async def flush(orders):
+        product_ids = set()
+        for order in orders:
+            for item in order["items"]:
+                try:
+                    product_ids.add(ObjectId(item["productId"]))
+                except InvalidId:
+                    continue
+
+        cursor = db.products.find({"_id": {"$in": list(product_ids)}}, {"name": 1, "price": 1})
+        products = {str(product["_id"]): product async for product in cursor}
+
+        operations = []
+        for order in orders:
+            items, total = snapshot_items(order["items"], products)
+            operations.append(
+                UpdateOne({"_id": order["_id"]}, {"$set": {"items": items, "total": total}})
+            )
+        await db.orders.bulk_write(operations, ordered=False)
+        return len(operations)
+
+    cursor = db.orders.find({"total": {"$exists": False}}).batch_size(batch_size)
+    async for order in cursor:
+        batch.append(order)
+        if len(batch) >= batch_size:
+            updated += await flush(batch)
+            batch = []
+
+    if batch:
+        updated += await flush(batch)
+
+    return updated
+
+
+if __name__ == "__main__":
+    print(f"Backfilled {asyncio.run(backfill_order_snapshots())} orders")
@@ -0,0 +1,53 @@
+from bson import ObjectId
+from bson.errors import InvalidId
+import base64
+import binascii
+import json
+
+
+def encode_cursor(last_id) -> str:
+    payload = json.dumps({"id": str(last_id)}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> ObjectId:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return ObjectId(payload["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError, InvalidId):
+        raise ValueError("Invalid cursor")
+
+
+def after_id(query: dict, after: ObjectId) -> dict:
+    id_filter = dict(query.get("_id", {}))
+    id_filter["$gt"] = after
+    return {**query, "_id": id_filter}
+
+
+def page_info(
+    count: int,
+    limit: int,
+    offset: int,
+    has_more: bool,
+    last_id=None,
+    cursor_mode: bool = False,
+    total: int = None,
+) -> dict:
+    if cursor_mode:
+        page = {"next": None, "limit": count, "previous": None}
+    else:
+        next_offset = offset + limit if has_more else None
+        prev_offset = offset - limit if offset - limit >= 0 else None
+        page = {
+            "next": str(next_offset) if next_offset is not None else None,
+            "limit": count,
+            "previous": prev_offset,
+        }
+
+    page["cursor"] = (
+        encode_cursor(last_id) if has_more and last_id is not None else None
+    )
+    if total is not None:
+        page["total"] = total
+    return page
@@ -0,0 +1,150 @@
+from db.cache import CacheBackend, InMemoryCache
+from db.product_repository import get_products
+from db.catalog_version import bump_catalog_version, get_catalog_versions
+from db.single_flight import single_flight
+from db.read_routing import changed_recently
+from db.batch_loader import (
+    BatchLoader,
+    PRODUCT_BATCH_MAX_SIZE,
+    PRODUCT_BATCH_WAIT_MS,
+)
+from bson import ObjectId
+import os
+
+PRODUCT_CACHE_ENABLED = os.getenv("PRODUCT_CACHE_ENABLED", "true").lower() == "true"
+PRODUCT_CACHE_MAX_ENTRIES = int(os.getenv("PRODUCT_CACHE_MAX_ENTRIES", "10000"))
+PRODUCT_CACHE_TTL_SECONDS = float(os.getenv("PRODUCT_CACHE_TTL_SECONDS", "30"))
+
+PRODUCT_PREFIX = "product:"
+LISTING_PREFIX = "list:"
+# Listings whose payload includes stock levels, invalidated on every order.
+STOCK_LISTING_PREFIX = "list:stock:"
+
+
+_cache = (
+    InMemoryCache(PRODUCT_CACHE_MAX_ENTRIES, PRODUCT_CACHE_TTL_SECONDS)
+    if PRODUCT_CACHE_ENABLED
+    else None
+)
+
+
+def set_product_cache(backend: CacheBackend):
+    global _cache
+    _cache = backend
+
+
+def get_product_cache():
+    return _cache
+
+
+def listing_key(*parts, stock: bool = False) -> str:
+    prefix = STOCK_LISTING_PREFIX if stock else LISTING_PREFIX
+    return prefix + "|".join("" if part is None else str(part) for part in parts)
+
+
+async def cached_listing(key: str, loader):
+    if _cache is None:
+        return await single_flight("listing", key, loader)
+
+    found = await _cache.get_many([key])
+    if key in found:
+        return found[key]
+
+    # Concurrent misses for the same page share one load and cache write.
+    return await single_flight("listing", key, lambda: _load_listing(key, loader))
+
+
+async def _load_listing(key: str, loader):
+    result = await loader()
+    if "error" not in result:
+        await _cache.set_many({key: result})
+    return result
+
+
+async def _load_products(product_ids: list) -> dict:
+    # Ids from many requests share a batch, so one malformed id must not fail
+    # the others; it simply resolves to no product.
+    valid_ids = [pid for pid in product_ids if ObjectId.is_valid(pid)]
+    if not valid_ids:
+        return {}
+
+    # Right after a catalog change a secondary could still return the old
+    # name or price, which would be cached under the new version.
+    versions = await get_catalog_versions()
+    products, _, _ = await get_products(
+        product_ids=valid_ids,
+        limit=len(valid_ids),
+        primary=changed_recently(versions["catalog_updated_at"]),
+    )
+    return {product["id"]: product for product in products}
+
+
+product_loader = BatchLoader(
+    "products", _load_products, PRODUCT_BATCH_MAX_SIZE, PRODUCT_BATCH_WAIT_MS
+)
+
+
+def product_key(catalog_version: int, product_id: str) -> str:
+    return f"{PRODUCT_PREFIX}{catalog_version}:{product_id}"
+
+
+async def _fetch_products(product_ids: list, catalog_version: int) -> dict:
+    # Keyed by the sorted id set so concurrent lookups of the same products
+    # (e.g. order history pages for one user) share one query; different
+    # sets arriving together are merged into one $in by the batch loader.
+    async def load():
+        return await product_loader.load_many(product_ids)
+
+    key = f"{catalog_version}:" + ",".join(sorted(set(product_ids)))
+    return dict(await single_flight("products", key, load))
+
+
+async def get_products_by_ids(product_ids: list) -> dict:
+    if not product_ids:
+        return {}
+
+    # Entries are keyed by the catalog version read before loading, so a
+    # load that raced an edit is stored under the old version and every
+    # worker stops reading it once it sees the bump.
+    catalog_version = (await get_catalog_versions())["catalog"]
+
+    if _cache is None:
+        return await _fetch_products(product_ids, catalog_version)
+
+    keys = {product_key(catalog_version, pid): pid for pid in product_ids}
+    found = await _cache.get_many(list(keys))
+    products_dict = {keys[key]: value for key, value in found.items()}
+
+    missing = [pid for pid in product_ids if pid not in products_dict]
+    if missing:
+        fetched = await _fetch_products(missing, catalog_version)
+        await _cache.set_many(
+            {
+                product_key(catalog_version, pid): product
+                for pid, product in fetched.items()
+            }
+        )
+        products_dict.update(fetched)
+
+    return products_dict
+
+
+async def invalidate_products(stock_only: bool = False):
+    await bump_catalog_version(stock_only)
+
+    if _cache is None:
+        return
+
+    if stock_only:
+        await _cache.delete_prefix(STOCK_LISTING_PREFIX)
+        return
+
+    # Entries under the previous catalog version can no longer be read.
+    await _cache.delete_prefix(PRODUCT_PREFIX)
+    await _cache.delete_prefix(LISTING_PREFIX)
+
+
+def product_cache_stats() -> dict:
+    if _cache is None:
+        return {"backend": None}
+    return _cache.stats()
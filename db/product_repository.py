@@ -1,27 +1,162 @@
-from db.database import get_db
+from db.database import get_db, get_read_db
+from db.pagination import after_id
+from db.counts import count_documents
+from db.catalog_version import get_catalog_versions
 from bson import ObjectId
-import re
+from db.search import query_terms, relevance_stages, search_fields
 
 
-def create_product(product_data):
+async def create_product(product_data: dict):
     db = get_db()
-    product = product_data.dict()
-    result = db.products.insert_one(product)
+    result = await db.products.insert_one(
+        {**product_data, **search_fields(product_data["name"])}
+    )
     return str(result.inserted_id)
 
 
-def get_products(name: str = None, size: str = None, limit: int = 10, offset: int = 0):
-    db = get_db()
+def build_query(name: str = None, size: str = None, product_ids: list = None):
     query = {}
 
-    if name:
-        query["name"] = {"$regex": re.escape(name), "$options": "i"}
+    # A name with no word characters has no terms; {"$all": []} would match
+    # nothing, so it is treated as no name filter.
+    terms = query_terms(name) if name else []
+    if terms:
+        query["search_terms"] = {"$all": terms}
 
     if size:
         query["sizes.size"] = size
 
-    products = db.products.find(query).skip(offset).limit(limit)
-    return [
-        {"id": str(product["_id"]), "name": product["name"], "price": product["price"]}
-        for product in products
-    ], db.products.count_documents(query)
+    if product_ids:
+        object_ids = [ObjectId(pid) for pid in product_ids]
+        query["_id"] = {"$in": object_ids}
+
+    return query
+
+
+async def _count_products(db, query: dict) -> int:
+    catalog_version = (await get_catalog_versions())["catalog"]
+    return await count_documents(db.products, query, catalog_version)
+
+
+PRODUCT_FIELDS = ("name", "price", "sizes")
+DEFAULT_PRODUCT_FIELDS = ("name", "price")
+
+
+def _projection(fields) -> dict:
+    # Naming _id keeps the projection non-empty for fields=id: an empty
+    # $project is rejected and an empty find() projection returns everything.
+    return {"_id": 1, **{field: 1 for field in fields}}
+
+
+def _to_response(product, fields=DEFAULT_PRODUCT_FIELDS):
+    response = {"id": str(product["_id"])}
+    for field in fields:
+        response[field] = product.get(field)
+    return response
+
+
+async def get_products(
+    name: str = None,
+    size: str = None,
+    product_ids: list = None,
+    limit: int = 10,
+    offset: int = 0,
+    include_total: bool = False,
+    fields=DEFAULT_PRODUCT_FIELDS,
+    primary: bool = False,
+):
+    db = get_read_db(primary)
+    query = build_query(name, size, product_ids)
+
+    # One extra document tells us whether another page exists without counting.
+    if name:
+        cursor = await db.products.aggregate(
+            [
+                {"$match": query},
+                *relevance_stages(name),
+                {"$skip": offset},
+                {"$limit": limit + 1},
+                {"$project": _projection(fields)},
+            ]
+        )
+    else:
+        cursor = (
+            db.products.find(query, _projection(fields))
+            .sort("_id", 1)
+            .skip(offset)
+            .limit(limit + 1)
+        )
+    products = [_to_response(product, fields) async for product in cursor]
+
+    total = await _count_products(db, query) if include_total else None
+    return products[:limit], len(products) > limit, total
+
+
+async def suggest_products(prefix: str, limit: int = 10, primary: bool = False):
+    db = get_read_db(primary)
+    cursor = await db.products.aggregate(
+        [
+            {"$match": build_query(name=prefix)},
+            *relevance_stages(prefix),
+            {"$limit": limit},
+            {"$project": {"name": 1}},
+        ]
+    )
+    return [{"id": str(product["_id"]), "name": product["name"]} async for product in cursor]
+
+
+async def get_products_after(
+    name: str = None,
+    size: str = None,
+    after: ObjectId = None,
+    limit: int = 10,
+    include_total: bool = False,
+    fields=DEFAULT_PRODUCT_FIELDS,
+    primary: bool = False,
+):
+    db = get_read_db(primary)
+    query = build_query(name, size)
+    total = await _count_products(db, query) if include_total else None
+    if after is not None:
+        query = after_id(query, after)
+
+    cursor = db.products.find(query, _projection(fields)).sort("_id", 1).limit(limit + 1)
+    products = [_to_response(product, fields) async for product in cursor]
+    return products[:limit], len(products) > limit, total
+
+
+async def iter_products(name: str = None, size: str = None, batch_size: int = 500):
+    db = get_read_db()
+    cursor = (
+        db.products.find(build_query(name, size), {"name": 1, "price": 1, "sizes": 1})
+        .sort("_id", 1)
+        .batch_size(batch_size)
+    )
+    async for product in cursor:
+        yield product
+
+
+async def find_products(product_ids: list, session=None):
+    db = get_db()
+    cursor = db.products.find(
+        {"_id": {"$in": product_ids}},
+        {"name": 1, "price": 1, "sizes": 1, "quantity": 1, "stock_sharded": 1},
+        session=session,
+    )
+    return {str(product["_id"]): product async for product in cursor}
+
+
+async def update_product(product_id: str, product_data: dict, session=None):
+    db = get_db()
+    result = await db.products.update_one(
+        {"_id": ObjectId(product_id)},
+        {"$set": {**product_data, **search_fields(product_data["name"])}},
+        session=session,
+    )
+    return result.matched_count
+
+
+async def delete_product(product_id: str):
+    db = get_db()
+    result = await db.products.delete_one({"_id": ObjectId(product_id)})
+    return result.deleted_count
@@ -0,0 +1,91 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+from db.database import MONGO_MAX_STALENESS_SECONDS, get_db
+import os
+import time
+
+# Secondaries may lag by up to MONGO_MAX_STALENESS_SECONDS, so reads that
+# must see a recent write go to the primary for that long.
+READ_YOUR_WRITES_SECONDS = float(
+    os.getenv("READ_YOUR_WRITES_SECONDS", str(max(MONGO_MAX_STALENESS_SECONDS, 90)))
+)
+READ_YOUR_WRITES_MAX_USERS = int(os.getenv("READ_YOUR_WRITES_MAX_USERS", "100000"))
+# How long a worker trusts a "no recent write" answer before asking again.
+READ_YOUR_WRITES_CHECK_SECONDS = float(os.getenv("READ_YOUR_WRITES_CHECK_SECONDS", "2"))
+
+# Each worker remembers recent answers so most history reads skip the
+# lookup; the user_writes collection makes a write visible to every other
+# worker. Values are the monotonic time the answer stops being valid.
+_recent_writers = OrderedDict()
+_quiet_users = OrderedDict()
+
+
+def _remember(answers: OrderedDict, user_id: str, deadline: float):
+    answers[user_id] = deadline
+    answers.move_to_end(user_id)
+    while len(answers) > READ_YOUR_WRITES_MAX_USERS:
+        answers.popitem(last=False)
+
+
+def _known(answers: OrderedDict, user_id: str) -> bool:
+    deadline = answers.get(user_id)
+    if deadline is None:
+        return False
+    if deadline <= time.monotonic():
+        del answers[user_id]
+        return False
+    return True
+
+
+async def record_user_writes(user_ids: list):
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids:
+        return
+
+    deadline = time.monotonic() + READ_YOUR_WRITES_SECONDS
+    for user_id in user_ids:
+        _quiet_users.pop(user_id, None)
+        _remember(_recent_writers, user_id, deadline)
+
+    # Documents expire through the TTL index on `until`.
+    until = datetime.utcnow() + timedelta(seconds=READ_YOUR_WRITES_SECONDS)
+    await get_db().user_writes.bulk_write(
+        [
+            UpdateOne({"_id": user_id}, {"$set": {"until": until}}, upsert=True)
+            for user_id in user_ids
+        ],
+        ordered=False,
+    )
+
+
+async def user_wrote_recently(user_id: str) -> bool:
+    if _known(_recent_writers, user_id):
+        return True
+    if _known(_quiet_users, user_id):
+        return False
+
+    # The write may have gone through another worker. get_db() reads from the
+    # primary, so the marker is seen as soon as it is acknowledged. If the
+    # primary cannot be reached the read falls back to the browse preference.
+    try:
+        marker = await get_db().user_writes.find_one(
+            {"_id": user_id, "until": {"$gt": datetime.utcnow()}}, {"until": 1}
+        )
+    except PyMongoError:
+        return False
+
+    if marker is None:
+        _remember(_quiet_users, user_id, time.monotonic() + READ_YOUR_WRITES_CHECK_SECONDS)
+        return False
+
+    remaining = (marker["until"] - datetime.utcnow()).total_seconds()
+    _remember(_recent_writers, user_id, time.monotonic() + remaining)
+    return True
+
+
+def changed_recently(updated_at: datetime) -> bool:
+    if updated_at is None:
+        return False
+    return (datetime.utcnow() - updated_at).total_seconds() < READ_YOUR_WRITES_SECONDS
@@ -0,0 +1,90 @@
+from pymongo import UpdateOne
+from db.database import get_db
+import asyncio
+import re
+
+MAX_GRAM_LENGTH = 20
+
+_TOKEN_PATTERN = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str) -> list:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def query_terms(text: str) -> list:
+    # Longer query tokens are truncated so they still hit the indexed grams.
+    terms = []
+    for token in tokenize(text):
+        term = token[:MAX_GRAM_LENGTH]
+        if term not in terms:
+            terms.append(term)
+    return terms
+
+
+def search_fields(name: str) -> dict:
+    # Edge n-grams of every token make "shi" match "T-Shirt" through the
+    # multikey index on search_terms instead of an unanchored regex.
+    tokens = tokenize(name)
+    grams = set()
+    for token in tokens:
+        for length in range(1, min(len(token), MAX_GRAM_LENGTH) + 1):
+            grams.add(token[:length])
+
+    return {
+        "search_name": " ".join(tokens),
+        "search_tokens": sorted(set(tokens)),
+        "search_terms": sorted(grams),
+    }
+
+
+def relevance_stages(text: str) -> list:
+    terms = query_terms(text)
+    phrase = " ".join(tokenize(text))
+
+    return [
+        {
+            "$addFields": {
+                "_score": {
+                    "$add": [
+                        {"$cond": [{"$eq": ["$search_name", phrase]}, 100, 0]},
+                        {
+                            "$cond": [
+                                {"$eq": [{"$indexOfCP": ["$search_name", phrase]}, 0]},
+                                10,
+                                0,
+                            ]
+                        },
+                        {"$size": {"$setIntersection": ["$search_tokens", terms]}},
+                    ]
+                },
+                "_length": {"$strLenCP": "$search_name"},
+            }
+        },
+        {"$sort": {"_score": -1, "_length": 1, "_id": 1}},
+    ]
+
+
+async def reindex_products(batch_size: int = 500):
+    db = get_db()
+    operations = []
+    updated = 0
+
+    async for product in db.products.find({}, {"name": 1}).batch_size(batch_size):
+        operations.append(
+            UpdateOne({"_id": product["_id"]}, {"$set": search_fields(product["name"])})
+        )
+        if len(operations) >= batch_size:
+            await db.products.bulk_write(operations, ordered=False)
+            updated += len(operations)
+            operations = []
+
+    if operations:
+        await db.products.bulk_write(operations, ordered=False)
+        updated += len(operations)
+
+    return updated
+
+
+if __name__ == "__main__":
+    print(f"Reindexed {asyncio.run(reindex_products())} products")
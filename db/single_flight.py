@@ -0,0 +1,54 @@
+from metrics import Counter, register
+import asyncio
+import os
+
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+
+single_flight_calls_total = register(
+    Counter(
+        "single_flight_calls_total",
+        "Reads by whether they ran the load (leader) or joined one in flight (shared).",
+        ("namespace", "role"),
+    )
+)
+
+_in_flight = {}
+
+
+async def single_flight(namespace: str, key: str, loader):
+    # Concurrent calls with the same key share one running load and its
+    # result. The load runs as its own task so a cancelled caller (client
+    # disconnect) does not cancel it for the others.
+    if not SINGLE_FLIGHT_ENABLED:
+        return await loader()
+
+    flight_key = (namespace, key)
+    task = _in_flight.get(flight_key)
+    if task is not None:
+        single_flight_calls_total.inc(namespace, "shared")
+        return await asyncio.shield(task)
+
+    def finished(task):
+        _in_flight.pop(flight_key, None)
+        # Marks a failure as retrieved even if every caller went away.
+        if not task.cancelled():
+            task.exception()
+
+    task = asyncio.ensure_future(loader())
+    _in_flight[flight_key] = task
+    task.add_done_callback(finished)
+    single_flight_calls_total.inc(namespace, "leader")
+    return await asyncio.shield(task)
+
+
+def single_flight_stats() -> dict:
+    with single_flight_calls_total.lock:
+        samples = dict(single_flight_calls_total.samples)
+
+    stats = {}
+    for (namespace, role), count in samples.items():
+        stats.setdefault(namespace, {"leader": 0, "shared": 0})[role] = count
+    for counts in stats.values():
+        total = counts["leader"] + counts["shared"]
+        counts["coalescing_ratio"] = round(counts["shared"] / total, 4) if total else 0.0
+    return stats
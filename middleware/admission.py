@@ -0,0 +1,180 @@
+from collections import OrderedDict
+from starlette.responses import JSONResponse
+from metrics import Counter, Gauge, register
+from middleware.metrics import request_method, route_template
+import math
+import os
+import time
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_INITIAL_LIMIT = float(os.getenv("ADMISSION_INITIAL_LIMIT", "32"))
+ADMISSION_MIN_LIMIT = float(os.getenv("ADMISSION_MIN_LIMIT", "2"))
+ADMISSION_MAX_LIMIT = float(os.getenv("ADMISSION_MAX_LIMIT", "256"))
+ADMISSION_LATENCY_TARGET_MS = float(os.getenv("ADMISSION_LATENCY_TARGET_MS", "250"))
+ADMISSION_BACKOFF_RATIO = float(os.getenv("ADMISSION_BACKOFF_RATIO", "0.9"))
+ADMISSION_GLOBAL_LIMIT = int(os.getenv("ADMISSION_GLOBAL_LIMIT", "512"))
+ADMISSION_PRIORITY_RESERVE = float(os.getenv("ADMISSION_PRIORITY_RESERVE", "0.2"))
+ADMISSION_PRIORITY_ROUTES = {
+    route.strip()
+    for route in os.getenv("ADMISSION_PRIORITY_ROUTES", "POST /api/orders").split(",")
+    if route.strip()
+}
+ADMISSION_EXEMPT_PATHS = {
+    path.strip()
+    for path in os.getenv(
+        "ADMISSION_EXEMPT_PATHS", "/,/health/db,/metrics,/docs,/openapi.json"
+    ).split(",")
+    if path.strip()
+}
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "1"))
+
+# Per-client token buckets; 0 disables rate limiting.
+RATE_LIMIT_PER_SECOND = float(os.getenv("RATE_LIMIT_PER_SECOND", "0"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "20"))
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000"))
+
+admission_rejected_total = register(
+    Counter(
+        "admission_rejected_total",
+        "Requests rejected before reaching a handler.",
+        ("route", "reason"),
+    )
+)
+admission_concurrency_limit = register(
+    Gauge("admission_concurrency_limit", "Current adaptive concurrency limit.", ("route",))
+)
+
+
+class AdaptiveLimit:
+    # AIMD: the limit grows by about one per `limit` fast responses and is
+    # cut by ADMISSION_BACKOFF_RATIO when a response is slow or fails. Cuts
+    # are spaced one latency target apart so a burst of slow responses from
+    # the same episode only counts once.
+
+    def __init__(self, route: str):
+        self.route = route
+        self.limit = ADMISSION_INITIAL_LIMIT
+        self.in_flight = 0
+        self.last_decrease = 0.0
+        admission_concurrency_limit.set(self.limit, route)
+
+    def try_acquire(self) -> bool:
+        if self.in_flight >= int(self.limit):
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self, seconds: float, ok: bool):
+        # Only grow while the limit is actually being used.
+        saturated = self.in_flight >= self.limit / 2
+        self.in_flight -= 1
+
+        now = time.monotonic()
+        target = ADMISSION_LATENCY_TARGET_MS / 1000
+        if not ok or seconds > target:
+            if now - self.last_decrease >= target:
+                self.limit = max(ADMISSION_MIN_LIMIT, self.limit * ADMISSION_BACKOFF_RATIO)
+                self.last_decrease = now
+        elif saturated:
+            self.limit = min(ADMISSION_MAX_LIMIT, self.limit + 1 / self.limit)
+        admission_concurrency_limit.set(round(self.limit, 2), self.route)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        # Returns 0 when a token was taken, otherwise seconds until one is
+        # available.
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self.limits = {}
+        self.buckets = OrderedDict()
+        self.in_flight = 0
+
+    def _bucket(self, client: str) -> TokenBucket:
+        bucket = self.buckets.get(client)
+        if bucket is None:
+            bucket = self.buckets[client] = TokenBucket(RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST)
+            if len(self.buckets) > RATE_LIMIT_MAX_CLIENTS:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(client)
+        return bucket
+
+    def _global_capacity(self, priority: bool) -> int:
+        # Browsing may only use the share left after the checkout reserve.
+        if priority:
+            return ADMISSION_GLOBAL_LIMIT
+        return int(ADMISSION_GLOBAL_LIMIT * (1 - ADMISSION_PRIORITY_RESERVE))
+
+    async def _reject(self, scope, receive, send, route, reason, status_code, retry_after):
+        admission_rejected_total.inc(route, reason)
+        detail = "Too many requests" if status_code == 429 else "Server overloaded, retry shortly"
+        response = JSONResponse(
+            {"detail": detail},
+            status_code=status_code,
+            headers={"Retry-After": str(retry_after)},
+        )
+        await response(scope, receive, send)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in ADMISSION_EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        route = f"{request_method(scope)} {route_template(scope)}"
+
+        if RATE_LIMIT_PER_SECOND > 0:
+            client = scope.get("client")
+            wait = self._bucket(client[0] if client else "unknown").take()
+            if wait:
+                await self._reject(
+                    scope, receive, send, route, "rate_limited", 429, math.ceil(wait)
+                )
+                return
+
+        priority = route in ADMISSION_PRIORITY_ROUTES
+        if self.in_flight >= self._global_capacity(priority):
+            await self._reject(
+                scope, receive, send, route, "overloaded", 503, ADMISSION_RETRY_AFTER_SECONDS
+            )
+            return
+
+        limit = self.limits.get(route)
+        if limit is None:
+            limit = self.limits[route] = AdaptiveLimit(route)
+        if not limit.try_acquire():
+            await self._reject(
+                scope, receive, send, route, "concurrency", 503, ADMISSION_RETRY_AFTER_SECONDS
+            )
+            return
+
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.in_flight -= 1
+            limit.release(time.perf_counter() - start, status[0] < 500)
@@ -1,19 +1,29 @@
-from fastapi import HTTPException, status, Depends
+from fastapi import HTTPException, status, Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
 from typing import Optional
+from collections import OrderedDict
+import hashlib
+import time
 import uuid
+from middleware.session_store import create_session_store
 
 load_dotenv()
 
 SECRET_KEY = os.getenv("JWT_SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
 
-active_sessions = {}
+session_store = create_session_store()
+
+# Claims of recently verified tokens keyed by token hash, so the signature is
+# checked once per token rather than once per call. Entries never outlive the
+# token's own exp; session validity is still checked against the store.
+verified_tokens = OrderedDict()
 
 security = HTTPBearer()
 
@@ -23,7 +33,9 @@ class JWTBearer(HTTPBearer):
         super(JWTBearer, self).__init__(auto_error=auto_error)
 
     async def __call__(
-        self, credentials: HTTPAuthorizationCredentials = Depends(security)
+        self,
+        request: Request,
+        credentials: HTTPAuthorizationCredentials = Depends(security),
     ):
         if credentials:
             if not credentials.scheme == "Bearer":
@@ -31,11 +43,13 @@ class JWTBearer(HTTPBearer):
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="Invalid authentication scheme.",
                 )
-            if not self.verify_jwt(credentials.credentials):
+            session = await self.verify_jwt(credentials.credentials)
+            if not session:
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="Invalid token or expired token.",
                 )
+            request.state.session = session
             return credentials.credentials
         else:
             raise HTTPException(
@@ -43,33 +57,58 @@ class JWTBearer(HTTPBearer):
                 detail="Invalid authorization code.",
             )
 
-    def verify_jwt(self, token: str) -> bool:
+    async def verify_jwt(self, token: str) -> Optional[dict]:
         try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            payload = decode_token(token)
             session_id = payload.get("session_id")
 
-            if session_id and session_id in active_sessions:
-                session = active_sessions[session_id]
-                if session["expires_at"] > datetime.utcnow():
-                    return True
-                else:
-                    del active_sessions[session_id]
-            return False
+            if session_id:
+                return await session_store.get(session_id)
+            return None
         except JWTError:
-            return False
+            return None
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def decode_token(token: str) -> dict:
+    key = _token_key(token)
+    cached = verified_tokens.get(key)
+    if cached is not None:
+        payload, expires_at = cached
+        if expires_at > time.time():
+            verified_tokens.move_to_end(key)
+            return payload
+        del verified_tokens[key]
+
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    expires_at = payload.get("exp")
+    if expires_at is not None:
+        verified_tokens[key] = (payload, expires_at)
+        if len(verified_tokens) > TOKEN_CACHE_MAX_ENTRIES:
+            verified_tokens.popitem(last=False)
+    return payload
 
 
-def create_session(user_data: dict = None) -> str:
+def forget_token(token: str):
+    verified_tokens.pop(_token_key(token), None)
+
+
+async def create_session(user_data: dict = None) -> str:
     session_id = str(uuid.uuid4())
     expires_at = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
 
     # Store session data
-    active_sessions[session_id] = {
-        "session_id": session_id,
-        "created_at": datetime.utcnow(),
-        "expires_at": expires_at,
-        "user_data": user_data or {},
-    }
+    await session_store.save(
+        {
+            "session_id": session_id,
+            "created_at": datetime.utcnow(),
+            "expires_at": expires_at,
+            "user_data": user_data or {},
+        }
+    )
 
     token_data = {"session_id": session_id, "exp": expires_at, "iat": datetime.utcnow()}
 
@@ -77,17 +116,15 @@ def create_session(user_data: dict = None) -> str:
     return token
 
 
-def get_session_data(token: str) -> dict:
+async def get_session_data(token: str) -> dict:
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         session_id = payload.get("session_id")
 
-        if session_id and session_id in active_sessions:
-            session = active_sessions[session_id]
-            if session["expires_at"] > datetime.utcnow():
+        if session_id:
+            session = await session_store.get(session_id)
+            if session:
                 return session
-            else:
-                del active_sessions[session_id]
 
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -102,39 +139,31 @@ def get_session_data(token: str) -> dict:
         )
 
 
-def invalidate_session(token: str) -> bool:
+async def invalidate_session(token: str, session: dict = None) -> bool:
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        session_id = payload.get("session_id")
+        if session is not None:
+            session_id = session["session_id"]
+        else:
+            session_id = decode_token(token).get("session_id")
 
-        if session_id and session_id in active_sessions:
-            del active_sessions[session_id]
-            return True
+        forget_token(token)
+        if session_id:
+            return await session_store.delete(session_id)
         return False
     except JWTError:
         return False
 
 
-def get_current_session(token: str = Depends(JWTBearer())):
-    return get_session_data(token)
-
-
-def refresh_session(token: str) -> str:
-    session_data = get_session_data(token)
-    invalidate_session(token)
+async def get_current_session(request: Request, token: str = Depends(JWTBearer())):
+    return request.state.session
 
-    return create_session(session_data.get("user_data", {}))
 
+async def refresh_session(token: str, session: dict = None) -> str:
+    session_data = session if session is not None else await get_session_data(token)
+    await invalidate_session(token, session_data)
 
-def get_active_sessions_count() -> int:
-    current_time = datetime.utcnow()
-    expired_sessions = [
-        session_id
-        for session_id, session in active_sessions.items()
-        if session["expires_at"] <= current_time
-    ]
+    return await create_session(session_data.get("user_data", {}))
 
-    for session_id in expired_sessions:
-        del active_sessions[session_id]
 
-    return len(active_sessions)
+async def get_active_sessions_count() -> int:
+    return await session_store.count()
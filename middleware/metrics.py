@@ -0,0 +1,71 @@
+from starlette.routing import Match
+from metrics import Counter, Gauge, Histogram, register
+import time
+
+
+http_requests_total = register(
+    Counter("http_requests_total", "HTTP requests handled.", ("method", "route", "status"))
+)
+http_request_duration_seconds = register(
+    Histogram("http_request_duration_seconds", "HTTP request latency.", ("method", "route"))
+)
+http_requests_in_flight = register(
+    Gauge("http_requests_in_flight", "HTTP requests currently being handled.", ("method", "route"))
+)
+
+
+HTTP_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+
+def request_method(scope) -> str:
+    # The method token comes from the client; anything outside the standard
+    # set shares one label so it cannot create unbounded series.
+    method = scope["method"]
+    return method if method in HTTP_METHODS else "OTHER"
+
+
+def route_template(scope) -> str:
+    # Labels use the route's path template so ids in the URL do not create
+    # a new series per request. The match is kept on the scope for the other
+    # middlewares.
+    template = scope.get("route_template")
+    if template is not None:
+        return template
+
+    template = "unmatched"
+    router = getattr(scope.get("app"), "router", None)
+    for route in getattr(router, "routes", ()):
+        match, _ = route.matches(scope)
+        if match != Match.NONE:
+            template = getattr(route, "path", scope["path"])
+            break
+    scope["route_template"] = template
+    return template
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = request_method(scope)
+        route = route_template(scope)
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc(method, route)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_request_duration_seconds.observe(time.perf_counter() - start, method, route)
+            http_requests_total.inc(method, route, str(status[0]))
+            http_requests_in_flight.dec(method, route)
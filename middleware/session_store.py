@@ -0,0 +1,86 @@
+from datetime import datetime
+from db.database import get_db
+import heapq
+import os
+
+SESSION_STORE = os.getenv("SESSION_STORE", "memory").lower()
+
+
+class SessionStore:
+    async def save(self, session: dict):
+        raise NotImplementedError
+
+    async def get(self, session_id: str) -> dict:
+        raise NotImplementedError
+
+    async def delete(self, session_id: str) -> bool:
+        raise NotImplementedError
+
+    async def count(self) -> int:
+        raise NotImplementedError
+
+
+class InMemorySessionStore(SessionStore):
+    # Sessions live in a dict; a min-heap ordered by expiry lets each sweep
+    # pop only the sessions that have actually expired.
+
+    def __init__(self):
+        self.sessions = {}
+        self.expiry_heap = []
+
+    def _sweep(self):
+        now = datetime.utcnow()
+        while self.expiry_heap and self.expiry_heap[0][0] <= now:
+            expires_at, session_id = heapq.heappop(self.expiry_heap)
+            session = self.sessions.get(session_id)
+            # Heap entries for sessions already logged out are skipped.
+            if session is not None and session["expires_at"] == expires_at:
+                del self.sessions[session_id]
+
+    async def save(self, session: dict):
+        self._sweep()
+        self.sessions[session["session_id"]] = session
+        heapq.heappush(self.expiry_heap, (session["expires_at"], session["session_id"]))
+
+    async def get(self, session_id: str) -> dict:
+        self._sweep()
+        return self.sessions.get(session_id)
+
+    async def delete(self, session_id: str) -> bool:
+        self._sweep()
+        return self.sessions.pop(session_id, None) is not None
+
+    async def count(self) -> int:
+        self._sweep()
+        return len(self.sessions)
+
+
+class MongoSessionStore(SessionStore):
+    # Shared across workers and nodes. Expired documents are removed by the
+    # TTL index on expires_at declared in db/indexes.py; reads also filter on
+    # expiry because the TTL monitor only runs about once a minute.
+
+    async def save(self, session: dict):
+        await get_db().sessions.insert_one({"_id": session["session_id"], **session})
+
+    async def get(self, session_id: str) -> dict:
+        return await get_db().sessions.find_one(
+            {"_id": session_id, "expires_at": {"$gt": datetime.utcnow()}}
+        )
+
+    async def delete(self, session_id: str) -> bool:
+        result = await get_db().sessions.delete_one({"_id": session_id})
+        return result.deleted_count > 0
+
+    async def count(self) -> int:
+        return await get_db().sessions.count_documents(
+            {"expires_at": {"$gt": datetime.utcnow()}}
+        )
+
+
+def create_session_store() -> SessionStore:
+    if SESSION_STORE == "mongo":
+        return MongoSessionStore()
+    if SESSION_STORE == "memory":
+        return InMemorySessionStore()
+    raise ValueError(f"Unknown SESSION_STORE: {SESSION_STORE}")
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from typing import List
-from models.product_model import OrderProductResponse
+from models.product_model import OrderProductResponse, PageInfo
 
 
 class OrderItem(BaseModel):
@@ -22,3 +22,8 @@ class OrderResponse(BaseModel):
     id: str
     items: List[OrderItemResponse]
     total: float
+
+
+class OrderListResponse(BaseModel):
+    data: List[OrderResponse]
+    page: PageInfo
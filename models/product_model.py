@@ -15,8 +15,9 @@ class ProductCreate(BaseModel):
 
 class ProductResponse(BaseModel):
     id: str
-    name: str
-    price: float
+    name: Optional[str] = None
+    price: Optional[float] = None
+    sizes: Optional[List[SizeQuantity]] = None
 
 
 class OrderProductResponse(BaseModel):
@@ -26,3 +27,16 @@ class OrderProductResponse(BaseModel):
 
 class ProductDB(ProductCreate):
     id: str
+
+
+class PageInfo(BaseModel):
+    next: Optional[str] = None
+    limit: int
+    previous: Optional[int] = None
+    cursor: Optional[str] = None
+    total: Optional[int] = None
+
+
+class ProductListResponse(BaseModel):
+    data: List[ProductResponse]
+    page: PageInfo
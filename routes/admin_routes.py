@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Depends, HTTPException
+from controllers.admin_controller import (
+    get_query_plan_report,
+    get_cache_stats,
+    shard_inventory,
+    unshard_inventory,
+)
+from middleware.auth import JWTBearer
+
+router = APIRouter()
+jwt_bearer = JWTBearer()
+
+
+@router.get("/query-plans")
+async def query_plans_endpoint(
+    # token: str = Depends(jwt_bearer)
+):
+    return await get_query_plan_report()
+
+
+@router.get("/cache/stats")
+def cache_stats_endpoint(
+    # token: str = Depends(jwt_bearer)
+):
+    return get_cache_stats()
+
+
+@router.post("/inventory/{product_id}/shards")
+async def shard_inventory_endpoint(
+    product_id: str,
+    shards: int = 8,
+    # token: str = Depends(jwt_bearer)
+):
+    result = await shard_inventory(product_id, shards)
+    if "error" in result:
+        status_code = 404 if result["error"] == "Product not found" else 400
+        raise HTTPException(status_code=status_code, detail=result["error"])
+    return result
+
+
+@router.delete("/inventory/{product_id}/shards")
+async def unshard_inventory_endpoint(
+    product_id: str,
+    # token: str = Depends(jwt_bearer)
+):
+    result = await unshard_inventory(product_id)
+    if "error" in result:
+        status_code = 404 if result["error"] == "Product not found" else 400
+        raise HTTPException(status_code=status_code, detail=result["error"])
+    return result
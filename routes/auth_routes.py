@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer
 from controllers.auth_controller import (
     create_new_session,
@@ -16,25 +16,25 @@ security = HTTPBearer()
 
 
 @router.post("/login", status_code=status.HTTP_201_CREATED)
-def login(request: SessionCreateRequest = None):
-    return create_new_session(request)
+async def login(request: SessionCreateRequest = None):
+    return await create_new_session(request)
 
 
 @router.post("/logout", status_code=status.HTTP_200_OK)
-def logout(token: str = Depends(jwt_bearer)):
-    return logout_session(token)
+async def logout(request: Request, token: str = Depends(jwt_bearer)):
+    return await logout_session(token, request.state.session)
 
 
 @router.post("/refresh", status_code=status.HTTP_200_OK)
-def refresh(token: str = Depends(jwt_bearer)):
-    return refresh_user_session(token)
+async def refresh(request: Request, token: str = Depends(jwt_bearer)):
+    return await refresh_user_session(token, request.state.session)
 
 
 @router.get("/session", status_code=status.HTTP_200_OK)
-def get_current_session(token: str = Depends(jwt_bearer)):
-    return get_session_info(token)
+async def get_current_session(request: Request, token: str = Depends(jwt_bearer)):
+    return await get_session_info(token, request.state.session)
 
 
 @router.get("/sessions/stats", status_code=status.HTTP_200_OK)
-def session_statistics():
-    return get_sessions_stats()
\ No newline at end of file
+async def session_statistics():
+    return await get_sessions_stats()
\ No newline at end of file
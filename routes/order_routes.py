@@ -1,11 +1,16 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
 from controllers.order_controller import (
     create_new_order,
+    import_orders,
     get_user_orders,
+    export_user_orders,
     delete_order,
     edit_order,
 )
-from models.order_model import OrderCreate
+from models.order_model import OrderCreate, OrderListResponse
+from controllers.serialization import json_response
+from controllers.export import EXPORT_FORMATS
 from middleware.auth import JWTBearer
 
 router = APIRouter()
@@ -17,17 +22,47 @@ async def create_order_endpoint(
     order: OrderCreate,
     # token: str = Depends(jwt_bearer)
 ):
-    return create_new_order(order)
+    return await create_new_order(order)
 
 
-@router.get("/orders/{user_id}")
+@router.post("/orders/bulk")
+async def bulk_create_orders_endpoint(
+    request: Request,
+    # token: str = Depends(jwt_bearer)
+):
+    return await import_orders(request.stream())
+
+
+@router.get(
+    "/orders/{user_id}",
+    response_model=OrderListResponse,
+    response_model_exclude_unset=True,
+)
 async def get_orders_endpoint(
     user_id: str,
     limit: int = 6,
     offset: int = 0,
+    cursor: str = None,
+    include_total: bool = False,
+    # token: str = Depends(jwt_bearer)
+):
+    result = await get_user_orders(user_id, limit, offset, cursor, include_total)
+    if "error" in result:
+        raise HTTPException(status_code=400, detail=result["error"])
+    return json_response(result)
+
+
+@router.get("/orders/{user_id}/export")
+async def export_orders_endpoint(
+    user_id: str,
+    format: str = "ndjson",
+    batch_size: int = 500,
     # token: str = Depends(jwt_bearer)
 ):
-    return get_user_orders(user_id, limit, offset)
+    result = await export_user_orders(user_id, format, batch_size)
+    if isinstance(result, dict):
+        raise HTTPException(status_code=400, detail=result["error"])
+    return StreamingResponse(result, media_type=EXPORT_FORMATS[format])
 
 
 @router.delete("/orders/{order_id}", status_code=204)
@@ -35,7 +70,7 @@ async def delete_order_endpoint(
     order_id: str,
     # token: str = Depends(jwt_bearer)
 ):
-    result = delete_order(order_id)
+    result = await delete_order(order_id)
     if not result:
         raise HTTPException(status_code=404, detail="Order not found")
     return {"detail": "Order deleted successfully"}
@@ -47,7 +82,7 @@ async def edit_order_endpoint(
     order: OrderCreate,
     # token: str = Depends(jwt_bearer)
 ):
-    result = edit_order(order_id, order)
+    result = await edit_order(order_id, order)
     if "error" in result:
         raise HTTPException(status_code=404, detail=result["error"])
     return {"detail": "Order updated successfully"}
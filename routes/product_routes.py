@@ -1,11 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Response
+from fastapi.responses import StreamingResponse
 from controllers.product_controller import (
     create_new_product,
     list_products,
+    export_products,
+    suggest_product_names,
     delete_product,
     edit_product,
+    listing_validators,
+    suggestion_validators,
 )
-from models.product_model import ProductCreate
+from models.product_model import ProductCreate, ProductListResponse
+from controllers.serialization import json_response
+from controllers.export import EXPORT_FORMATS
+from controllers.conditional import etag_matches, not_modified, with_headers
 from middleware.auth import JWTBearer
 
 router = APIRouter()
@@ -17,18 +25,63 @@ async def create_product_endpoint(
     product: ProductCreate,
     # token: str = Depends(jwt_bearer)
 ):
-    return create_new_product(product)
+    return await create_new_product(product)
 
 
-@router.get("/products")
+@router.get(
+    "/products", response_model=ProductListResponse, response_model_exclude_unset=True
+)
 async def get_products_endpoint(
+    response: Response,
     name: str = None,
     size: str = None,
     limit: int = 6,
     offset: int = 0,
+    cursor: str = None,
+    include_total: bool = False,
+    fields: str = None,
+    if_none_match: str = Header(None),
+    # token: str = Depends(jwt_bearer),
+):
+    validators = await listing_validators(fields)
+    if validators and etag_matches(if_none_match, validators["ETag"]):
+        return not_modified(validators)
+
+    result = await list_products(
+        name, size, limit, offset, cursor, include_total, fields
+    )
+    if "error" in result:
+        raise HTTPException(status_code=400, detail=result["error"])
+    return with_headers(json_response(result), response, validators)
+
+
+@router.get("/products/suggest")
+async def suggest_products_endpoint(
+    response: Response,
+    prefix: str,
+    limit: int = 10,
+    if_none_match: str = Header(None),
+    # token: str = Depends(jwt_bearer),
+):
+    validators = await suggestion_validators()
+    if etag_matches(if_none_match, validators["ETag"]):
+        return not_modified(validators)
+
+    return with_headers(await suggest_product_names(prefix, limit), response, validators)
+
+
+@router.get("/products/export")
+async def export_products_endpoint(
+    name: str = None,
+    size: str = None,
+    format: str = "ndjson",
+    batch_size: int = 500,
     # token: str = Depends(jwt_bearer),
 ):
-    return list_products(name, size, limit, offset)
+    result = await export_products(name, size, format, batch_size)
+    if isinstance(result, dict):
+        raise HTTPException(status_code=400, detail=result["error"])
+    return StreamingResponse(result, media_type=EXPORT_FORMATS[format])
 
 
 @router.delete("/products/{product_id}", status_code=204)
@@ -36,7 +89,7 @@ async def delete_product_endpoint(
     product_id: str,
     #   token: str = Depends(jwt_bearer)
 ):
-    return delete_product(product_id)
+    return await delete_product(product_id)
 
 
 @router.put("/products/{product_id}", status_code=202)
@@ -45,7 +98,7 @@ async def edit_product_endpoint(
     product: ProductCreate,
     # token: str = Depends(jwt_bearer)
 ):
-    updated_product = edit_product(product_id, product)
+    updated_product = await edit_product(product_id, product)
     if not updated_product:
         raise HTTPException(status_code=404, detail="Product not found")
     return updated_product
@@ -0,0 +1,77 @@
+from dotenv import load_dotenv
+import importlib.util
+import os
+import uvicorn
+
+# Configuration is loaded once here; workers inherit the environment.
+load_dotenv()
+
+
+def _default_workers() -> int:
+    # Respects CPU affinity limits (e.g. container cpusets) where available.
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "0")) or _default_workers()
+KEEP_ALIVE_TIMEOUT = int(os.getenv("KEEP_ALIVE_TIMEOUT", "5"))
+BACKLOG = int(os.getenv("BACKLOG", "2048"))
+LIMIT_CONCURRENCY = int(os.getenv("LIMIT_CONCURRENCY", "0")) or None
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+ACCESS_LOG = os.getenv("ACCESS_LOG", "false").lower() == "true"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "info")
+
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def _check_session_store(workers: int):
+    # In-memory sessions exist only in the worker that created them, and
+    # uvicorn's workers share one socket, so the next request with the same
+    # token usually lands on a worker that rejects it.
+    if workers <= 1:
+        return
+
+    store = os.getenv("SESSION_STORE")
+    if store is None:
+        os.environ["SESSION_STORE"] = "mongo"
+        print("SESSION_STORE not set; using the mongo session store for multiple workers")
+    elif store.lower() == "memory":
+        raise SystemExit(
+            "SESSION_STORE=memory cannot be shared between workers; "
+            "use SESSION_STORE=mongo or set WEB_CONCURRENCY=1"
+        )
+
+
+def main():
+    _check_session_store(WEB_CONCURRENCY)
+    loop = "uvloop" if _available("uvloop") else "asyncio"
+    http = "httptools" if _available("httptools") else "h11"
+    print(f"Starting {WEB_CONCURRENCY} worker(s) on {HOST}:{PORT} (loop={loop}, http={http})")
+
+    # On SIGTERM each worker stops accepting connections, waits up to
+    # GRACEFUL_TIMEOUT seconds for in-flight requests and then runs the app
+    # lifespan shutdown, which closes the MongoDB pool.
+    uvicorn.run(
+        "app:app",
+        host=HOST,
+        port=PORT,
+        workers=WEB_CONCURRENCY,
+        loop=loop,
+        http=http,
+        timeout_keep_alive=KEEP_ALIVE_TIMEOUT,
+        backlog=BACKLOG,
+        limit_concurrency=LIMIT_CONCURRENCY,
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+        access_log=ACCESS_LOG,
+        log_level=LOG_LEVEL,
+        proxy_headers=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
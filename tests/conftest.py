@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+
+
+@pytest.fixture
+def memory_db():
+    from benchmarks.memory_mongo import install
+    import db.database as database
+
+    install()
+    yield database.get_db()
+    database._client = None
+    database._browse_db = None
@@ -0,0 +1,89 @@
+import pytest
+
+from middleware import admission
+from middleware.admission import AdaptiveLimit, TokenBucket
+
+
+class _Clock:
+    now = 100.0
+
+    @classmethod
+    def monotonic(cls):
+        return cls.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    _Clock.now = 100.0
+    monkeypatch.setattr(admission, "time", _Clock)
+    monkeypatch.setattr(admission, "ADMISSION_INITIAL_LIMIT", 4.0)
+    monkeypatch.setattr(admission, "ADMISSION_MIN_LIMIT", 1.0)
+    monkeypatch.setattr(admission, "ADMISSION_MAX_LIMIT", 8.0)
+    monkeypatch.setattr(admission, "ADMISSION_LATENCY_TARGET_MS", 100.0)
+    monkeypatch.setattr(admission, "ADMISSION_BACKOFF_RATIO", 0.5)
+    return _Clock
+
+
+def test_adaptive_limit_admits_up_to_limit(clock):
+    limit = AdaptiveLimit("GET /test")
+
+    assert [limit.try_acquire() for _ in range(5)] == [True] * 4 + [False]
+    limit.release(0.01, True)
+    assert limit.try_acquire() is True
+
+
+def test_adaptive_limit_backs_off_once_per_episode(clock):
+    limit = AdaptiveLimit("GET /test")
+    for _ in range(3):
+        limit.try_acquire()
+
+    limit.release(0.5, True)
+    limit.release(0.01, False)
+    assert limit.limit == 2.0
+
+    clock.now += 1
+    limit.release(0.5, True)
+    assert limit.limit == 1.0
+    assert limit.in_flight == 0
+
+
+def test_adaptive_limit_grows_only_when_saturated(clock):
+    limit = AdaptiveLimit("GET /test")
+
+    limit.try_acquire()
+    limit.release(0.01, True)
+    assert limit.limit == 4.0
+
+    for _ in range(4):
+        limit.try_acquire()
+    limit.release(0.01, True)
+    assert limit.limit == 4.25
+
+
+def test_adaptive_limit_stays_under_max(clock):
+    limit = AdaptiveLimit("GET /test")
+    limit.limit = 8.0
+
+    for _ in range(8):
+        limit.try_acquire()
+    limit.release(0.01, True)
+
+    assert limit.limit == 8.0
+
+
+def test_token_bucket_allows_burst_then_waits(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+
+    assert [bucket.take() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.take() == 0.5
+
+    clock.now += 0.5
+    assert bucket.take() == 0.0
+
+
+def test_token_bucket_refill_is_capped_at_burst(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+    bucket.take()
+
+    clock.now += 60
+    assert [bucket.take() for _ in range(4)] == [0.0, 0.0, 0.0, 0.5]
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from db.batch_loader import BatchLoader
+
+
+def _loader(max_batch_size=100, wait_ms=5, error=None):
+    batches = []
+
+    async def load(keys):
+        batches.append(sorted(keys))
+        if error is not None:
+            raise error
+        return {key: key.upper() for key in keys if key != "missing"}
+
+    return BatchLoader("test", load, max_batch_size, wait_ms), batches
+
+
+def test_concurrent_keys_share_one_batch_after_timer():
+    loader, batches = _loader()
+
+    async def run():
+        return await asyncio.gather(
+            loader.load_many(["a", "b"]),
+            loader.load_many(["b", "missing"]),
+        )
+
+    assert asyncio.run(run()) == [{"a": "A", "b": "B"}, {"b": "B"}]
+    assert batches == [["a", "b", "missing"]]
+
+
+def test_flushes_when_batch_is_full():
+    loader, batches = _loader(max_batch_size=2, wait_ms=10_000)
+
+    async def run():
+        return await asyncio.wait_for(loader.load_many(["a", "b", "c", "d"]), 1)
+
+    assert asyncio.run(run()) == {"a": "A", "b": "B", "c": "C", "d": "D"}
+    assert batches == [["a", "b"], ["c", "d"]]
+    assert loader.flush_handle is None
+
+
+def test_failure_reaches_every_caller():
+    loader, batches = _loader(error=RuntimeError("boom"))
+
+    async def run():
+        return await asyncio.gather(
+            loader.load_many(["a"]),
+            loader.load_many(["b"]),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+    assert [str(result) for result in results] == ["boom", "boom"]
+    assert batches == [["a", "b"]]
+    assert loader.tasks == set()
+
+
+def test_next_batch_starts_after_failure():
+    loader, batches = _loader(error=RuntimeError("boom"))
+
+    async def load(keys):
+        batches.append(sorted(keys))
+        return {key: 1 for key in keys}
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await loader.load_many(["a"])
+        loader.load_fn = load
+        return await loader.load_many(["a"])
+
+    assert asyncio.run(run()) == {"a": 1}
+    assert batches == [["a"], ["a"]]
@@ -0,0 +1,168 @@
+from bson import ObjectId
+import asyncio
+
+import pytest
+
+from db import inventory
+from db.inventory import (
+    StockConflictError,
+    _allocate_shards,
+    apply_stock_deductions,
+    reserve_stock,
+    restripe_if_sharded,
+    run_transaction,
+    shard_product_stock,
+    stock_deductions,
+    stock_levels,
+)
+from db.product_repository import update_product
+from models.order_model import OrderItem
+
+
+def _product(name="Shirt", **sizes):
+    return {
+        "_id": ObjectId(),
+        "name": name,
+        "sizes": [{"size": size, "quantity": qty} for size, qty in sizes.items()],
+    }
+
+
+def _catalog(*products):
+    return {str(product["_id"]): product for product in products}
+
+
+def test_reserve_stock_deducts_sizes_in_order():
+    product = _product(S=2, M=3)
+    products = _catalog(product)
+    levels = stock_levels(products)
+    pid = str(product["_id"])
+
+    assert reserve_stock([OrderItem(productId=pid, qty=4)], products, levels) is None
+    assert levels[pid] == [0, 1]
+
+
+def test_reserve_stock_sums_repeated_items():
+    product = _product(S=2, M=1)
+    products = _catalog(product)
+    levels = stock_levels(products)
+    pid = str(product["_id"])
+    items = [OrderItem(productId=pid, qty=2), OrderItem(productId=pid, qty=2)]
+
+    error = reserve_stock(items, products, levels)
+
+    assert error == "Insufficient stock for Shirt. Available: 3, Requested: 4"
+    assert levels[pid] == [2, 1]
+
+
+def test_reserve_stock_unknown_product():
+    pid = str(ObjectId())
+
+    error = reserve_stock([OrderItem(productId=pid, qty=1)], {}, {})
+
+    assert error == f"Product with ID {pid} not found"
+
+
+def test_allocate_shards_starts_at_random_shard(monkeypatch):
+    monkeypatch.setattr(inventory.random, "randrange", lambda n: 2)
+    shards = [(0, 5), (1, 5), (2, 1), (3, 0)]
+
+    assert _allocate_shards(shards, 4) == [(2, 1), (0, 3)]
+
+
+def test_allocate_shards_stops_when_covered():
+    shards = [(shard, 10) for shard in range(8)]
+
+    allocations = _allocate_shards(shards, 3)
+
+    assert len(allocations) == 1
+    assert allocations[0][1] == 3
+
+
+def test_allocate_shards_never_takes_more_than_available():
+    shards = [(0, 1), (1, 0), (2, 2)]
+
+    allocations = _allocate_shards(shards, 10)
+
+    assert sorted(allocations) == [(0, 1), (2, 2)]
+
+
+def test_stock_deductions_only_for_changed_sizes():
+    product = _product(S=2, M=3)
+    untouched = _product("Hat", S=1)
+    products = _catalog(product, untouched)
+    levels = stock_levels(products)
+    levels[str(product["_id"])] = [2, 1]
+
+    deductions = stock_deductions(products, levels)
+
+    assert deductions == [
+        {
+            "productId": product["_id"],
+            "match": {"sizes.1.size": "M"},
+            "decrements": {"sizes.1.quantity": 2},
+            "shards": [],
+        }
+    ]
+
+
+def test_stock_deductions_for_sharded_product(monkeypatch):
+    monkeypatch.setattr(inventory.random, "randrange", lambda n: 0)
+    product = _product(S=3)
+    product["_shards"] = {"S": [(0, 1), (1, 2)]}
+    products = _catalog(product)
+    levels = {str(product["_id"]): [1]}
+
+    deductions = stock_deductions(products, levels)
+
+    assert deductions[0]["decrements"] == {}
+    assert deductions[0]["shards"] == [("S", 0, 1), ("S", 1, 1)]
+
+
+def test_apply_stock_deductions(memory_db):
+    product = _product(S=2, M=3)
+    asyncio.run(memory_db.products.insert_one(product))
+    products = _catalog(product)
+    levels = stock_levels(products)
+    pid = str(product["_id"])
+    reserve_stock([OrderItem(productId=pid, qty=3)], products, levels)
+
+    asyncio.run(apply_stock_deductions(stock_deductions(products, levels)))
+
+    stored = asyncio.run(memory_db.products.find_one({"_id": product["_id"]}))
+    assert [size["quantity"] for size in stored["sizes"]] == [0, 2]
+
+
+def test_apply_stock_deductions_rejects_stale_plan(memory_db):
+    product = _product(S=2)
+    asyncio.run(memory_db.products.insert_one(product))
+    products = _catalog(product)
+    levels = stock_levels(products)
+    pid = str(product["_id"])
+    reserve_stock([OrderItem(productId=pid, qty=2)], products, levels)
+    asyncio.run(
+        memory_db.products.update_one(
+            {"_id": product["_id"]}, {"$set": {"sizes.0.quantity": 1}}
+        )
+    )
+
+    with pytest.raises(StockConflictError):
+        asyncio.run(apply_stock_deductions(stock_deductions(products, levels)))
+
+
+def test_restripe_replaces_shard_totals(memory_db):
+    product = _product(S=8)
+    asyncio.run(memory_db.products.insert_one(product))
+    pid = str(product["_id"])
+    asyncio.run(shard_product_stock(pid, 4))
+
+    async def edit(session):
+        await update_product(
+            pid, {"name": "Shirt", "price": 1, "sizes": [{"size": "S", "quantity": 6}]}, session
+        )
+        return await restripe_if_sharded(pid, session)
+
+    assert asyncio.run(run_transaction(edit)) == {"id": pid, "shards": 4, "sizes": 1}
+    shards = asyncio.run(
+        memory_db.inventory_shards.find({"productId": product["_id"]}).to_list(length=None)
+    )
+    assert sorted(shard["quantity"] for shard in shards) == [1, 1, 2, 2]
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+import asyncio
+
+import pytest
+
+from middleware import session_store
+from middleware.session_store import InMemorySessionStore
+
+START = datetime(2024, 1, 1)
+
+
+class _Clock:
+    now = START
+
+    @classmethod
+    def utcnow(cls):
+        return cls.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    _Clock.now = START
+    monkeypatch.setattr(session_store, "datetime", _Clock)
+    return _Clock
+
+
+def _session(session_id, minutes):
+    return {"session_id": session_id, "expires_at": START + timedelta(minutes=minutes)}
+
+
+def test_expired_sessions_are_swept(clock):
+    store = InMemorySessionStore()
+    asyncio.run(store.save(_session("short", 1)))
+    asyncio.run(store.save(_session("long", 10)))
+
+    clock.now = START + timedelta(minutes=5)
+
+    assert asyncio.run(store.get("short")) is None
+    assert asyncio.run(store.get("long")) is not None
+    assert asyncio.run(store.count()) == 1
+    assert len(store.expiry_heap) == 1
+
+
+def test_resaved_session_survives_stale_heap_entry(clock):
+    store = InMemorySessionStore()
+    asyncio.run(store.save(_session("s", 1)))
+    assert asyncio.run(store.delete("s")) is True
+    asyncio.run(store.save(_session("s", 10)))
+
+    clock.now = START + timedelta(minutes=5)
+
+    assert asyncio.run(store.get("s"))["expires_at"] == START + timedelta(minutes=10)
+    assert len(store.expiry_heap) == 1
+
+
+def test_delete_unknown_session(clock):
+    store = InMemorySessionStore()
+
+    assert asyncio.run(store.delete("missing")) is False
@@ -0,0 +1,59 @@
+import asyncio
+
+from db import single_flight as flights
+from db.single_flight import single_flight
+
+
+def test_concurrent_calls_share_one_load():
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def run():
+        return await asyncio.gather(*(single_flight("test", "key", loader) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["value"] * 5
+    assert len(calls) == 1
+    assert flights._in_flight == {}
+
+
+def test_cancelled_caller_does_not_cancel_others():
+    async def run():
+        started = asyncio.Event()
+
+        async def loader():
+            await started.wait()
+            return "value"
+
+        first = asyncio.ensure_future(single_flight("test", "cancel", loader))
+        second = asyncio.ensure_future(single_flight("test", "cancel", loader))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        started.set()
+        return first, await second
+
+    first, value = asyncio.run(run())
+    assert first.cancelled()
+    assert value == "value"
+    assert flights._in_flight == {}
+
+
+def test_failure_reaches_every_caller_and_clears_key():
+    async def loader():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def run():
+        return await asyncio.gather(
+            single_flight("test", "error", loader),
+            single_flight("test", "error", loader),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+    assert [str(result) for result in results] == ["boom", "boom"]
+    assert flights._in_flight == {}